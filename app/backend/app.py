@@ -1,16 +1,51 @@
 import base64
+import codecs
+import hashlib
+import html
+import json
 import os
 import sys
-from datetime import datetime, timedelta
-from decimal import Decimal
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation
 from functools import wraps
-from flask import Flask, jsonify, request, g
+from flask import Flask, Response, jsonify, request, g
 from flask_cors import CORS
-from sqlalchemy import and_, func, or_
+from sqlalchemy import (
+    Date,
+    DateTime,
+    Integer,
+    Numeric,
+    and_,
+    case,
+    cast,
+    delete,
+    event,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    true,
+    tuple_,
+    type_coerce,
+    union_all,
+    update,
+)
+from psycopg2 import errorcodes
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError, OperationalError
 from dotenv import load_dotenv
 from werkzeug.security import check_password_hash, generate_password_hash
 
-from db import get_session, SessionLocal
+from billing import run_billing
+from db import bind_sessions, bump_change_version, engine, get_session, SessionLocal
+from exports import stream_export, validate_export
+from maintenance import MAINTENANCE_RESOLVED, MAINTENANCE_STATUSES, adjust_maintenance_stats, rebuild_maintenance_stats
+from reconciliation import reconcile_settlements
+from revenue import REVENUE_DIMENSIONS, record_payment_revenue
+from scheduler import plan_class_schedule
+from typeahead import MemberPrefixIndex
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 if PROJECT_ROOT not in sys.path:
     sys.path.append(PROJECT_ROOT)
@@ -19,21 +54,29 @@ load_dotenv()
 
 from models import (
     Base,
+    ChangeVersion,
     ClassRegistration,
+    ClassWaitlist,
     Equipment,
     FitnessGoal,
     GroupClass,
+    IdempotencyKey,
     HealthMetric,
+    HealthMetricDaily,
     Invoice,
     InvoiceItem,
     MaintenanceLog,
+    MaintenanceStats,
     Member,
+    MemberSummary,
     Payment,
     PersonalTrainingSession,
+    RevenueDaily,
     Room,
     Trainer,
     TrainerAvailability,
 )
+from models.member import member_search_text
 
 app = Flask(__name__)
 
@@ -41,6 +84,37 @@ app = Flask(__name__)
 ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "admin")
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "admin")
 
+# How long an Idempotency-Key's stored response is replayed, and how long a
+# duplicate waits for the first attempt with the same key to finish
+IDEMPOTENCY_TTL = timedelta(hours=int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24")))
+IDEMPOTENCY_WAIT_SECONDS = int(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30"))
+# Expired keys deleted per transaction by the purge endpoint
+IDEMPOTENCY_PURGE_BATCH = int(os.getenv("IDEMPOTENCY_PURGE_BATCH", "5000"))
+
+# Lifetime of the per-process room readiness snapshot; local equipment and
+# maintenance writes invalidate it immediately
+ROOM_READINESS_TTL_SECONDS = float(os.getenv("ROOM_READINESS_TTL_SECONDS", "30"))
+# Refuse new PT sessions in rooms whose critical equipment is out of service
+PT_REQUIRE_CRITICAL_EQUIPMENT = os.getenv("PT_REQUIRE_CRITICAL_EQUIPMENT", "false").lower() == "true"
+EQUIPMENT_OPERATIONAL = "OPERATIONAL"
+EQUIPMENT_STATUSES = (EQUIPMENT_OPERATIONAL, "UNDER_REPAIR", "OUT_OF_SERVICE")
+# Reported for equipment rows whose status was stored as NULL
+EQUIPMENT_STATUS_UNKNOWN = "UNKNOWN"
+room_readiness_cache = {}
+
+# Members queued per full class before registration is refused outright
+CLASS_WAITLIST_LIMIT = int(os.getenv("CLASS_WAITLIST_LIMIT", "20"))
+# Longest date range (inclusive, in days) a single class series may cover
+CLASS_SERIES_MAX_DAYS = int(os.getenv("CLASS_SERIES_MAX_DAYS", "366"))
+
+# In-process member name index for /members/typeahead; falls back to SQL when disabled
+MEMBER_TYPEAHEAD_ENABLED = os.getenv("MEMBER_TYPEAHEAD_ENABLED", "true").lower() == "true"
+MEMBER_TYPEAHEAD_MAX_MEMBERS = int(os.getenv("MEMBER_TYPEAHEAD_MAX_MEMBERS", "200000"))
+# How often a worker compares its index against the database change version
+MEMBER_TYPEAHEAD_CHECK_SECONDS = float(os.getenv("MEMBER_TYPEAHEAD_CHECK_SECONDS", "5"))
+member_typeahead = MemberPrefixIndex(MEMBER_TYPEAHEAD_MAX_MEMBERS)
+member_typeahead_checked_at = None
+
 # Allow local dev frontends (Vite on 5173, CRA on 3000) to call the API
 default_origins = "http://localhost:3000,http://localhost:5173,http://127.0.0.1:5173"
 origins = [o for o in os.getenv("CORS_ORIGINS", default_origins).split(",") if o]
@@ -107,12 +181,185 @@ def require_role(*allowed_roles):
     return decorator
 
 
+def idempotent(fn):
+    """Honour an Idempotency-Key header on a POST handler (apply below require_role).
+
+    The first request with a key inserts the key row and keeps that transaction
+    open while the handler runs on the same connection (its get_session blocks
+    join it), so the handler's writes and the stored response commit together. A
+    concurrent duplicate blocks on the row's unique key until the outcome is
+    committed and then replays it without re-running the handler. Exceptions and
+    5xx responses roll back both the handler's work and the claim so the client
+    can retry; keys expire after IDEMPOTENCY_TTL.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if not key:
+            return fn(*args, **kwargs)
+        if len(key) > 255:
+            return jsonify({"error": "Idempotency-Key must be at most 255 characters"}), 400
+        auth = g.current_auth
+        caller = auth.get("member_id") or auth.get("trainer_id") or auth.get("username")
+        scope = f"{request.method} {request.path} {auth['role']}:{caller}"[:255]
+        request_hash = hashlib.sha256(request.get_data()).hexdigest()
+        key_filter = and_(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+
+        claim = pg_insert(IdempotencyKey).values(scope=scope, key=key, request_hash=request_hash)
+        claim = claim.on_conflict_do_update(
+            index_elements=[IdempotencyKey.scope, IdempotencyKey.key],
+            set_={
+                "request_hash": claim.excluded.request_hash,
+                "status_code": None,
+                "response_body": None,
+                "mimetype": None,
+                "created_at": func.now(),
+            },
+            # Only an expired key may be taken over; a live one makes this a no-op
+            where=IdempotencyKey.created_at < func.now() - IDEMPOTENCY_TTL,
+        ).returning(IdempotencyKey.key)
+
+        # Closing the connection rolls back whatever was not committed
+        with engine.connect() as conn:
+            tx = conn.begin()
+            conn.execute(
+                select(func.set_config("lock_timeout", f"{IDEMPOTENCY_WAIT_SECONDS}s", True))
+            )
+            try:
+                claimed = conn.execute(claim).first() is not None
+            except OperationalError as exc:
+                # Only the lock_timeout above means a duplicate is running; anything else is a real failure
+                if getattr(exc.orig, "pgcode", None) != errorcodes.LOCK_NOT_AVAILABLE:
+                    raise
+                return jsonify({"error": "A request with this Idempotency-Key is still in progress"}), 409
+            if not claimed:
+                stored = conn.execute(select(IdempotencyKey).where(key_filter)).first()
+                if stored.request_hash != request_hash:
+                    return jsonify({"error": "Idempotency-Key was already used with a different request"}), 422
+                replay = Response(stored.response_body, status=stored.status_code, mimetype=stored.mimetype)
+                replay.headers["Idempotent-Replayed"] = "true"
+                return replay
+
+            # The wait limit is for the claim only; the handler's own locks may wait
+            conn.execute(select(func.set_config("lock_timeout", "0", True)))
+            with bind_sessions(conn):
+                response = app.make_response(fn(*args, **kwargs))
+            if response.status_code >= 500:
+                return response
+            conn.execute(
+                update(IdempotencyKey)
+                .where(key_filter)
+                .values(
+                    status_code=response.status_code,
+                    response_body=response.get_data(as_text=True),
+                    mimetype=response.mimetype,
+                )
+            )
+            tx.commit()
+            return response
+
+    return wrapper
+
+
+def purge_expired_idempotency_keys(session, batch_size=IDEMPOTENCY_PURGE_BATCH):
+    """Delete up to ``batch_size`` expired Idempotency-Key rows, oldest first; return how many.
+
+    The batch is picked through the created_at index; keys locked by a request
+    taking them over are skipped.
+    """
+    expired = (
+        select(IdempotencyKey.scope, IdempotencyKey.key)
+        .where(IdempotencyKey.created_at < func.now() - IDEMPOTENCY_TTL)
+        .order_by(IdempotencyKey.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    return session.execute(
+        delete(IdempotencyKey).where(tuple_(IdempotencyKey.scope, IdempotencyKey.key).in_(expired)),
+        execution_options={"synchronize_session": False},
+    ).rowcount
+
+
+@app.route("/admin/idempotency-keys/purge", methods=["POST"])
+@require_role("admin")
+def admin_purge_idempotency_keys():
+    """Delete expired Idempotency-Key rows in short transactions; meant for a periodic job."""
+    purged = 0
+    while True:
+        with get_session() as session:
+            deleted = purge_expired_idempotency_keys(session)
+        purged += deleted
+        if deleted < IDEMPOTENCY_PURGE_BATCH:
+            return jsonify({"purged": purged})
+
+
 def decimal_to_float(val):
     if isinstance(val, Decimal):
         return float(val)
     return val
 
 
+def member_search_terms(text_query):
+    """Return (filter, rank) expressions for fuzzy member search.
+
+    Substring matches and pg_trgm word similarity (the <% operator) over name,
+    username and email are both served by the trigram GIN index on
+    member_search_text; word_similarity orders the results.
+    """
+    needle = text_query.strip().lower()
+    matches = or_(
+        member_search_text.contains(needle, autoescape=True),
+        literal(needle).op("<%")(member_search_text),
+    )
+    return matches, func.word_similarity(needle, member_search_text)
+
+
+def current_change_version(session, name):
+    """Committed change version for ``name``; 0 until its first write."""
+    return session.scalar(select(ChangeVersion.version).where(ChangeVersion.name == name)) or 0
+
+
+def record_member_name_change(session, m: Member):
+    """Bump the members change version and apply the write to the local type-ahead index.
+
+    The index is updated once ``session`` commits; applying it earlier would serve
+    names (and a version) that a rollback discards.
+    """
+    version = bump_change_version(session, "members")
+    if MEMBER_TYPEAHEAD_ENABLED:
+        entry = (m.member_id, m.first_name, m.last_name, m.username, version)
+        event.listen(session, "after_commit", lambda _: member_typeahead.upsert(*entry), once=True)
+
+
+def refresh_member_typeahead(session, force=False):
+    """Rebuild the type-ahead index when another writer has moved the change version.
+
+    The database is consulted at most every MEMBER_TYPEAHEAD_CHECK_SECONDS, which
+    bounds how stale a worker's index can get.
+    """
+    global member_typeahead_checked_at
+    now = datetime.utcnow()
+    if (
+        not force
+        and member_typeahead.version is not None
+        and member_typeahead_checked_at
+        and (now - member_typeahead_checked_at).total_seconds() < MEMBER_TYPEAHEAD_CHECK_SECONDS
+    ):
+        return
+    version = current_change_version(session, "members")
+    if force or version != member_typeahead.version:
+        rows = session.execute(select(Member.member_id, Member.first_name, Member.last_name, Member.username))
+        member_typeahead.rebuild(rows, version)
+    member_typeahead_checked_at = now
+
+
+def warm_member_typeahead():
+    """Build the type-ahead index at startup so the first lookup doesn't pay for it."""
+    if MEMBER_TYPEAHEAD_ENABLED:
+        with get_session() as session:
+            refresh_member_typeahead(session, force=True)
+
+
 def member_dict(m: Member):
     return {
         "member_id": m.member_id,
@@ -138,7 +385,7 @@ def trainer_dict(t: Trainer):
     }
 
 
-def class_dict(c: GroupClass, enrolled=0):
+def class_dict(c: GroupClass):
     return {
         "class_id": c.class_id,
         "class_name": c.class_name,
@@ -147,7 +394,7 @@ def class_dict(c: GroupClass, enrolled=0):
         "trainer_id": c.trainer_id,
         "room_id": c.room_id,
         "status": c.status,
-        "enrolled": enrolled,
+        "enrolled": c.enrolled_count,
         "trainer_name": f"{c.trainer.first_name} {c.trainer.last_name}" if c.trainer else None,
         "room_name": c.room.room_name if c.room else None,
     }
@@ -197,6 +444,7 @@ def invoice_to_dict(inv: Invoice):
         "issue_date": inv.issue_date.isoformat() if inv.issue_date else None,
         "due_date": inv.due_date.isoformat() if inv.due_date else None,
         "total_amount": decimal_to_float(inv.total_amount),
+        "amount_paid": decimal_to_float(inv.amount_paid),
         "status": inv.status,
         "notes": inv.notes,
         "items": items,
@@ -239,25 +487,71 @@ def register_member():
         )
         session.add(member)
         session.flush()
+        record_member_name_change(session, member)
         return jsonify({"member_id": member.member_id}), 201
 
 
 @app.route("/members/search", methods=["GET"])
 @require_role("trainer", "admin")
 def search_members():
-    name = request.args.get("name")
+    name = request.args.get("name", "").strip()
     if not name:
         return jsonify({"error": "Name query required"}), 400
+    try:
+        limit = min(int(request.args.get("limit", 20)), 100)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
 
-    like_pattern = f"%{name}%"
+    matches, rank = member_search_terms(name)
     with get_session() as session:
-        members = (
-            session.query(Member)
-            .filter(or_(Member.first_name.ilike(like_pattern), Member.last_name.ilike(like_pattern)))
-            .order_by(Member.last_name)
+        rows = (
+            session.query(Member, rank.label("score"))
+            .filter(matches)
+            .order_by(rank.desc(), Member.last_name, Member.member_id)
+            .limit(limit)
+            .all()
+        )
+        return jsonify([{**member_dict(m), "score": round(score, 3)} for m, score in rows]), 200
+
+
+@app.route("/members/typeahead", methods=["GET"])
+@require_role("trainer", "admin")
+def member_typeahead_lookup():
+    prefix = request.args.get("q", "").strip().lower()
+    if not prefix:
+        return jsonify({"error": "q query required"}), 400
+    try:
+        limit = min(int(request.args.get("limit", 10)), 50)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    with get_session() as session:
+        if MEMBER_TYPEAHEAD_ENABLED:
+            refresh_member_typeahead(session)
+            if member_typeahead.enabled:
+                return jsonify(member_typeahead.search(prefix, limit)), 200
+        # Index disabled or over its memory bound: answer from the database instead
+        full_name = func.lower(Member.first_name + " " + Member.last_name)
+        rows = (
+            session.query(Member.member_id, Member.first_name, Member.last_name, Member.username)
+            .filter(
+                or_(
+                    *(
+                        column.startswith(prefix, autoescape=True)
+                        for column in (
+                            func.lower(Member.first_name),
+                            func.lower(Member.last_name),
+                            full_name,
+                            func.lower(Member.username),
+                        )
+                    )
+                )
+            )
+            .order_by(Member.last_name, Member.first_name, Member.member_id)
+            .limit(limit)
             .all()
         )
-        return jsonify([member_dict(m) for m in members]), 200
+        return jsonify([dict(r._mapping) for r in rows]), 200
 
 
 @app.route("/members/<int:member_id>", methods=["GET"])
@@ -301,6 +595,8 @@ def update_member(member_id):
                 return jsonify({"error": f"{key} already in use"}), 400
         setattr(m, key, value)
         session.flush()
+        if key in ("first_name", "last_name", "username"):
+            record_member_name_change(session, m)
         return jsonify(member_dict(m)), 200
 
 
@@ -344,7 +640,7 @@ def add_goal(member_id):
             member_id=member_id, goal_type=data["goal_type"], target_value=data["target_value"]
         )
         session.add(goal)
-        session.flush()
+        refresh_member_summaries(session, [member_id])
         return (
             jsonify(
                 {
@@ -375,7 +671,7 @@ def update_goal(member_id, goal_id):
             goal.target_value = data["target_value"]
         if "is_active" in data:
             goal.is_active = bool(data["is_active"])
-        session.flush()
+        refresh_member_summaries(session, [member_id])
         return jsonify(
             {
                 "goal_id": goal.goal_id,
@@ -397,9 +693,150 @@ def delete_goal(goal_id):
         if auth["role"] == "member" and auth.get("member_id") != goal.member_id:
             return jsonify({"error": "Forbidden"}), 403
         session.delete(goal)
+        refresh_member_summaries(session, [goal.member_id])
         return jsonify({"message": "Goal deleted"})
 
 
+# Goal types are free text; the first keyword found decides which metric tracks the goal
+GOAL_METRIC_KEYWORDS = [
+    ("fat", "body_fat"),
+    ("weight", "weight"),
+    ("muscle", "weight"),
+    ("mass", "weight"),
+    ("heart", "heart_rate"),
+    ("cardio", "heart_rate"),
+    ("endurance", "heart_rate"),
+]
+# Projections further out than this are reported as unknown
+GOAL_PROJECTION_MAX_DAYS = int(os.getenv("GOAL_PROJECTION_MAX_DAYS", str(5 * 365)))
+
+
+def goal_progress(session, member_id=None, active_only=True):
+    """Compute progress for goals in one grouped pass over their members' metric history.
+
+    Per goal the database returns the first and latest reading of the tracked metric
+    (window functions over the history, sorted once) and a least-squares slope
+    (units/day) via regr_slope; the remaining arithmetic is per goal row. Pass
+    member_id to restrict the batch to one member.
+    """
+    goal_type = func.lower(FitnessGoal.goal_type)
+    metric_name = case(*[(goal_type.contains(keyword), metric) for keyword, metric in GOAL_METRIC_KEYWORDS])
+    value = case(
+        (metric_name == "weight", HealthMetric.weight),
+        (metric_name == "body_fat", HealthMetric.body_fat),
+        (metric_name == "heart_rate", cast(HealthMetric.heart_rate, Numeric)),
+    )
+    goal_filters = []
+    if member_id is not None:
+        goal_filters.append(FitnessGoal.member_id == member_id)
+    if active_only:
+        goal_filters.append(FitnessGoal.is_active.is_(True))
+
+    history = dict(partition_by=FitnessGoal.goal_id, order_by=HealthMetric.recorded_at, rows=(None, None))
+    readings = (
+        select(
+            FitnessGoal.goal_id,
+            value.label("value"),
+            HealthMetric.recorded_at,
+            (func.extract("epoch", HealthMetric.recorded_at) / 86400).label("day"),
+            func.first_value(value).over(**history).label("baseline"),
+            func.last_value(value).over(**history).label("current"),
+        )
+        .join(HealthMetric, HealthMetric.member_id == FitnessGoal.member_id)
+        .where(value.isnot(None), *goal_filters)
+        .subquery()
+    )
+    stats = (
+        select(
+            readings.c.goal_id,
+            func.count().label("readings"),
+            func.max(readings.c.baseline).label("baseline"),
+            func.max(readings.c.current).label("current"),
+            func.max(readings.c.recorded_at).label("last_recorded_at"),
+            func.regr_slope(readings.c.value, readings.c.day).label("slope_per_day"),
+        )
+        .group_by(readings.c.goal_id)
+        .subquery()
+    )
+    query = (
+        select(
+            FitnessGoal.goal_id,
+            FitnessGoal.member_id,
+            FitnessGoal.goal_type,
+            FitnessGoal.target_value,
+            FitnessGoal.is_active,
+            metric_name.label("metric"),
+            func.coalesce(stats.c.readings, 0).label("readings"),
+            stats.c.baseline,
+            stats.c.current,
+            stats.c.last_recorded_at,
+            stats.c.slope_per_day,
+        )
+        .outerjoin(stats, stats.c.goal_id == FitnessGoal.goal_id)
+        .where(*goal_filters)
+        .order_by(FitnessGoal.member_id, FitnessGoal.goal_id)
+    )
+
+    results = []
+    for row in session.execute(query):
+        target = row.target_value
+        baseline, current, slope = row.baseline, row.current, row.slope_per_day
+        percent = None
+        projected = None
+        if current is not None:
+            if baseline == target:
+                percent = 100.0 if current == target else 0.0
+            else:
+                percent = float(max(min((baseline - current) / (baseline - target), 1), 0) * 100)
+            remaining = float(target - current)
+            if remaining == 0:
+                projected = row.last_recorded_at.date().isoformat()
+            elif slope and (remaining > 0) == (slope > 0):
+                # A near-flat trend projects centuries out (or past datetime's range)
+                days = remaining / float(slope)
+                if days <= GOAL_PROJECTION_MAX_DAYS:
+                    try:
+                        projected = (row.last_recorded_at + timedelta(days=days)).date().isoformat()
+                    except OverflowError:
+                        projected = None
+        results.append(
+            {
+                "goal_id": row.goal_id,
+                "member_id": row.member_id,
+                "goal_type": row.goal_type,
+                "target_value": decimal_to_float(target),
+                "is_active": row.is_active,
+                "metric": row.metric,
+                "readings": row.readings,
+                "baseline_value": decimal_to_float(baseline),
+                "current_value": decimal_to_float(current),
+                "percent_to_target": round(percent, 1) if percent is not None else None,
+                "trend_per_day": round(float(slope), 4) if slope is not None else None,
+                "projected_completion": projected,
+            }
+        )
+    return results
+
+
+@app.route("/members/<int:member_id>/goals/progress", methods=["GET"])
+@require_role("member", "admin")
+def get_goal_progress(member_id):
+    auth = g.current_auth
+    if auth["role"] == "member" and auth.get("member_id") != member_id:
+        return jsonify({"error": "Forbidden"}), 403
+    include_inactive = request.args.get("include_inactive", "false").lower() == "true"
+    with get_session() as session:
+        return jsonify(goal_progress(session, member_id=member_id, active_only=not include_inactive))
+
+
+@app.route("/admin/reports/goal-progress", methods=["GET"])
+@require_role("admin")
+def admin_goal_progress_report():
+    include_inactive = request.args.get("include_inactive", "false").lower() == "true"
+    with get_session() as session:
+        return jsonify(goal_progress(session, active_only=not include_inactive))
+
+
 @app.route("/members/<int:member_id>/health-metrics", methods=["GET"])
 @require_role("member", "admin")
 def get_health_metrics(member_id):
@@ -432,6 +869,116 @@ def get_health_metrics(member_id):
         )
 
 
+METRIC_SERIES_BUCKETS = ("day", "week", "month")
+METRIC_SERIES_AGGREGATES = {"avg": func.avg, "min": func.min, "max": func.max}
+METRIC_SERIES_FIELDS = ("weight", "heart_rate", "body_fat")
+# Most buckets one series response may hold; longer series need a range or a coarser bucket
+METRIC_SERIES_MAX_POINTS = int(os.getenv("METRIC_SERIES_MAX_POINTS", "1000"))
+
+
+@app.route("/members/<int:member_id>/health-metrics/series", methods=["GET"])
+@require_role("member", "admin")
+def get_health_metric_series(member_id):
+    auth = g.current_auth
+    if auth["role"] == "member" and auth.get("member_id") != member_id:
+        return jsonify({"error": "Forbidden"}), 403
+    bucket = request.args.get("bucket", "day")
+    if bucket not in METRIC_SERIES_BUCKETS:
+        return jsonify({"error": "bucket must be day, week or month"}), 400
+    aggs = [a.strip() for a in request.args.get("agg", "avg").split(",") if a.strip()]
+    if not aggs or any(a not in METRIC_SERIES_AGGREGATES for a in aggs):
+        return jsonify({"error": "agg must be a comma-separated list of avg, min, max"}), 400
+    try:
+        rolling = int(request.args.get("rolling", 0))
+    except ValueError:
+        return jsonify({"error": "rolling must be an integer"}), 400
+    if rolling < 0:
+        return jsonify({"error": "rolling must be 0 (off) or a positive number of buckets"}), 400
+    try:
+        start_date = datetime.fromisoformat(request.args["start_date"]) if request.args.get("start_date") else None
+        end_date = datetime.fromisoformat(request.args["end_date"]) if request.args.get("end_date") else None
+    except ValueError:
+        return jsonify({"error": "start_date and end_date must be ISO dates"}), 400
+
+    # Raw readings and the daily rollup kept for dropped partitions are each reduced
+    # to per-bucket sums, counts and extremes, then combined; a day is only ever in
+    # one of them, since partitions are rolled up in the transaction that drops them
+    raw_bucket = func.date_trunc(bucket, HealthMetric.recorded_at, type_=DateTime)
+    raw_columns = [raw_bucket.label("bucket"), func.count().label("readings")]
+    day = cast(HealthMetricDaily.day, DateTime)
+    daily_bucket = func.date_trunc(bucket, day, type_=DateTime)
+    daily_columns = [daily_bucket.label("bucket"), func.sum(HealthMetricDaily.readings).label("readings")]
+    for field in METRIC_SERIES_FIELDS:
+        value = getattr(HealthMetric, field)
+        count = getattr(HealthMetricDaily, f"{field}_readings")
+        raw_columns += [
+            func.sum(value).label(f"{field}_sum"),
+            func.count(value).label(f"{field}_count"),
+            func.min(value).label(f"{field}_min"),
+            func.max(value).label(f"{field}_max"),
+        ]
+        daily_columns += [
+            func.sum(getattr(HealthMetricDaily, f"{field}_avg") * count).label(f"{field}_sum"),
+            func.sum(count).label(f"{field}_count"),
+            func.min(getattr(HealthMetricDaily, f"{field}_min")).label(f"{field}_min"),
+            func.max(getattr(HealthMetricDaily, f"{field}_max")).label(f"{field}_max"),
+        ]
+    raw = select(*raw_columns).where(HealthMetric.member_id == member_id)
+    daily = select(*daily_columns).where(HealthMetricDaily.member_id == member_id)
+    if start_date:
+        raw = raw.where(HealthMetric.recorded_at >= start_date)
+        daily = daily.where(day >= start_date)
+    if end_date:
+        raw = raw.where(HealthMetric.recorded_at <= end_date)
+        daily = daily.where(day <= end_date)
+    parts = union_all(raw.group_by(raw_bucket), daily.group_by(daily_bucket)).subquery("parts")
+
+    columns = [parts.c.bucket, cast(func.sum(parts.c.readings), Integer).label("readings")]
+    for field in METRIC_SERIES_FIELDS:
+        columns += [
+            (func.sum(parts.c[f"{field}_sum"]) / func.nullif(func.sum(parts.c[f"{field}_count"]), 0)).label(
+                f"{field}_avg"
+            ),
+            func.min(parts.c[f"{field}_min"]).label(f"{field}_min"),
+            func.max(parts.c[f"{field}_max"]).label(f"{field}_max"),
+        ]
+    buckets = select(*columns).group_by(parts.c.bucket).subquery("buckets")
+
+    outer = [buckets]
+    if rolling:
+        for field in METRIC_SERIES_FIELDS:
+            outer.append(
+                func.avg(buckets.c[f"{field}_avg"])
+                .over(order_by=buckets.c.bucket, rows=(-(rolling - 1), 0))
+                .label(f"{field}_rolling_avg")
+            )
+
+    with get_session() as session:
+        rows = session.execute(
+            select(*outer).order_by(buckets.c.bucket).limit(METRIC_SERIES_MAX_POINTS + 1)
+        ).mappings().all()
+        if len(rows) > METRIC_SERIES_MAX_POINTS:
+            return (
+                jsonify(
+                    {
+                        "error": f"The series has more than {METRIC_SERIES_MAX_POINTS} buckets; "
+                        "narrow start_date/end_date or use a coarser bucket"
+                    }
+                ),
+                400,
+            )
+        points = []
+        for row in rows:
+            point = {"bucket": row["bucket"].isoformat(), "readings": row["readings"]}
+            for field in METRIC_SERIES_FIELDS:
+                values = {agg: decimal_to_float(row[f"{field}_{agg}"]) for agg in aggs}
+                if rolling:
+                    values[f"rolling_{rolling}_avg"] = decimal_to_float(row[f"{field}_rolling_avg"])
+                point[field] = values
+            points.append(point)
+        return jsonify({"bucket": bucket, "agg": aggs, "rolling": rolling, "points": points}), 200
+
+
 @app.route("/members/<int:member_id>/health-metrics", methods=["POST"])
 @require_role("member", "admin")
 def add_health_metric(member_id):
@@ -447,7 +994,7 @@ def add_health_metric(member_id):
             body_fat=data.get("body_fat"),
         )
         session.add(metric)
-        session.flush()
+        refresh_member_summaries(session, [member_id])
         return (
             jsonify(
                 {
@@ -462,6 +1009,102 @@ def add_health_metric(member_id):
         )
 
 
+# Readings accepted per bulk request, and rows per INSERT statement
+BULK_METRIC_MAX_ROWS = int(os.getenv("BULK_METRIC_MAX_ROWS", "100000"))
+BULK_METRIC_CHUNK = 5000
+
+
+def parse_metric_reading(raw):
+    """Validate one wearable reading; return an insertable dict or raise ValueError."""
+    if not isinstance(raw, dict):
+        raise ValueError("reading must be an object")
+    if not isinstance(raw.get("recorded_at"), str):
+        raise ValueError("recorded_at required as an ISO timestamp")
+    recorded_at = datetime.fromisoformat(raw["recorded_at"])
+    if recorded_at.tzinfo:
+        recorded_at = recorded_at.astimezone(timezone.utc).replace(tzinfo=None)
+    reading = {"recorded_at": recorded_at}
+    for field, low, high in (("weight", 0, 999.99), ("body_fat", 0, 100), ("heart_rate", 20, 300)):
+        value = raw.get(field)
+        if value is not None:
+            try:
+                value = Decimal(str(value))
+                in_range = low <= value <= high
+            except (ArithmeticError, TypeError, ValueError):
+                raise ValueError(f"{field} must be numeric")
+            if not in_range:
+                raise ValueError(f"{field} out of range")
+            if field == "heart_rate":
+                # Stored as an integer; truncating 72.9 to 72 would silently change the reading
+                if value != value.to_integral_value():
+                    raise ValueError("heart_rate must be a whole number")
+                value = int(value)
+        reading[field] = value
+    if reading["weight"] is None and reading["heart_rate"] is None and reading["body_fat"] is None:
+        raise ValueError("reading has no values")
+    return reading
+
+
+@app.route("/members/<int:member_id>/health-metrics/bulk", methods=["POST"])
+@require_role("member", "admin")
+def bulk_add_health_metrics(member_id):
+    auth = g.current_auth
+    if auth["role"] == "member" and auth.get("member_id") != member_id:
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        if request.mimetype == "application/x-ndjson":
+            raw_readings = [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+        else:
+            raw_readings = request.get_json()
+    except ValueError:
+        return jsonify({"error": "Body must be a JSON array or NDJSON"}), 400
+    if not isinstance(raw_readings, list) or not raw_readings:
+        return jsonify({"error": "At least one reading required"}), 400
+    if len(raw_readings) > BULK_METRIC_MAX_ROWS:
+        return jsonify({"error": f"At most {BULK_METRIC_MAX_ROWS} readings per request"}), 400
+
+    rows = {}
+    rejected = []
+    valid = 0
+    for index, raw in enumerate(raw_readings):
+        try:
+            reading = parse_metric_reading(raw)
+        except ValueError as exc:
+            rejected.append({"index": index, "error": str(exc)})
+            continue
+        reading["member_id"] = member_id
+        valid += 1
+        # First reading wins for a duplicate timestamp, inside the payload as against
+        # rows already stored (ON CONFLICT DO NOTHING)
+        rows.setdefault(reading["recorded_at"], reading)
+    rows = list(rows.values())
+
+    with get_session() as session:
+        if not session.get(Member, member_id):
+            return jsonify({"error": "Member not found"}), 404
+        inserted = 0
+        for start in range(0, len(rows), BULK_METRIC_CHUNK):
+            stmt = (
+                pg_insert(HealthMetric)
+                .values(rows[start : start + BULK_METRIC_CHUNK])
+                .on_conflict_do_nothing(index_elements=[HealthMetric.member_id, HealthMetric.recorded_at])
+            )
+            inserted += session.execute(stmt).rowcount
+        if inserted:
+            refresh_member_summaries(session, [member_id])
+        return (
+            jsonify(
+                {
+                    "received": len(raw_readings),
+                    "inserted": inserted,
+                    "duplicates": valid - inserted,
+                    "rejected": rejected,
+                }
+            ),
+            201 if inserted else 200,
+        )
+
+
 # ---- Class registration ----
 @app.route("/classes/available", methods=["GET"])
 @require_role("member", "trainer", "admin")
@@ -469,18 +1112,16 @@ def get_available_classes():
     now = datetime.utcnow()
     with get_session() as session:
         classes = (
-            session.query(
-                GroupClass,
-                func.count(ClassRegistration.member_id).label("enrolled"),
+            session.query(GroupClass)
+            .filter(
+                GroupClass.class_time > now,
+                GroupClass.status == "SCHEDULED",
+                GroupClass.enrolled_count < GroupClass.capacity,
             )
-            .outerjoin(ClassRegistration, GroupClass.class_id == ClassRegistration.class_id)
-            .filter(GroupClass.class_time > now, GroupClass.status == "SCHEDULED")
-            .group_by(GroupClass.class_id)
             .order_by(GroupClass.class_time)
             .all()
         )
-        result = [class_dict(gc, enrolled=count) for gc, count in classes if count < gc.capacity]
-        return jsonify(result), 200
+        return jsonify([class_dict(gc) for gc in classes]), 200
 
 
 @app.route("/members/<int:member_id>/classes", methods=["GET"])
@@ -502,6 +1143,7 @@ def get_registered_classes(member_id):
 
 @app.route("/classes/register", methods=["POST"])
 @require_role("member", "admin")
+@idempotent
 def register_for_class():
     data = request.get_json()
     member_id = data["member_id"]
@@ -524,22 +1166,207 @@ def register_for_class():
         )
         if exists:
             return jsonify({"error": "Already registered"}), 400
-
-        enrolled = (
-            session.query(func.count(ClassRegistration.member_id))
-            .filter(ClassRegistration.class_id == class_id)
-            .scalar()
+        waiting = (
+            session.query(ClassWaitlist.waitlist_id)
+            .filter(ClassWaitlist.member_id == member_id, ClassWaitlist.class_id == class_id)
+            .first()
         )
-        if enrolled >= group_class.capacity:
-            return jsonify({"error": "Class is full"}), 400
+        if waiting:
+            return jsonify({"error": "Already on the waitlist"}), 400
 
         if member_has_time_conflict(session, member_id, group_class.class_time):
             return jsonify({"error": "Schedule conflict with another class or PT session"}), 400
 
+        # Claim a seat atomically; no row comes back when the class is already full
+        if reserve_class_seat(session, class_id) is None:
+            if not data.get("waitlist", True) or reserve_waitlist_spot(session, class_id) is None:
+                return jsonify({"error": "Class is full"}), 400
+            entry = ClassWaitlist(member_id=member_id, class_id=class_id)
+            session.add(entry)
+            try:
+                session.flush()
+            except IntegrityError:
+                session.rollback()
+                return jsonify({"error": "Already on the waitlist"}), 400
+            # Seats can be free while earlier waiters are passed over for conflicts;
+            # hand them out in queue order now that this member is in the queue too
+            session.refresh(group_class, with_for_update=True)
+            promoted = fill_open_seats(session, group_class)
+            if promoted:
+                refresh_member_summaries(session, promoted)
+            if member_id in promoted:
+                return jsonify({"message": "Registered successfully"}), 201
+            position = (
+                session.query(func.count(ClassWaitlist.waitlist_id))
+                .filter(ClassWaitlist.class_id == class_id, ClassWaitlist.waitlist_id <= entry.waitlist_id)
+                .scalar()
+            )
+            return jsonify({"message": "Class is full; added to waitlist", "waitlist_position": position}), 202
+
         session.add(ClassRegistration(member_id=member_id, class_id=class_id))
+        try:
+            session.flush()
+        except IntegrityError:
+            # A concurrent request for the same member won the insert; drop our seat claim too
+            session.rollback()
+            return jsonify({"error": "Already registered"}), 400
+        refresh_member_summaries(session, [member_id])
         return jsonify({"message": "Registered successfully"}), 201
 
 
+@app.route("/classes/register/bulk", methods=["POST"])
+@require_role("member", "admin")
+@idempotent
+def bulk_register_for_classes():
+    data = request.get_json()
+    pairs = data.get("registrations") or []
+    mode = data.get("mode", "best_effort")
+    if not pairs:
+        return jsonify({"error": "registrations required"}), 400
+    if mode not in ("best_effort", "all_or_nothing"):
+        return jsonify({"error": "mode must be best_effort or all_or_nothing"}), 400
+    try:
+        pairs = [(int(p["member_id"]), int(p["class_id"])) for p in pairs]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "Each registration needs member_id and class_id"}), 400
+    auth = g.current_auth
+    if auth["role"] == "member" and any(member_id != auth.get("member_id") for member_id, _ in pairs):
+        return jsonify({"error": "Forbidden"}), 403
+
+    member_ids = {m for m, _ in pairs}
+    class_ids = {c for _, c in pairs}
+    now = datetime.utcnow()
+    with get_session() as session:
+        # Lock the target classes in a stable order so seat accounting below is exact
+        classes = {
+            gc.class_id: gc
+            for gc in session.query(GroupClass)
+            .filter(GroupClass.class_id.in_(class_ids))
+            .order_by(GroupClass.class_id)
+            .with_for_update()
+        }
+        known_members = {
+            m for (m,) in session.query(Member.member_id).filter(Member.member_id.in_(member_ids))
+        }
+        existing = set(
+            session.query(ClassRegistration.member_id, ClassRegistration.class_id).filter(
+                ClassRegistration.member_id.in_(member_ids), ClassRegistration.class_id.in_(class_ids)
+            )
+        )
+        waiting = set(
+            session.query(ClassWaitlist.member_id, ClassWaitlist.class_id).filter(
+                ClassWaitlist.member_id.in_(member_ids), ClassWaitlist.class_id.in_(class_ids)
+            )
+        )
+
+        # Everything each member is already booked into around the requested classes
+        times = [gc.class_time for gc in classes.values()] or [now]
+        window_start = min(times) - timedelta(hours=1)
+        window_end = max(times) + timedelta(hours=1)
+        booked_classes = {}
+        for member_id, class_time in (
+            session.query(ClassRegistration.member_id, GroupClass.class_time)
+            .join(GroupClass, GroupClass.class_id == ClassRegistration.class_id)
+            .filter(
+                ClassRegistration.member_id.in_(member_ids),
+                GroupClass.status == "SCHEDULED",
+                GroupClass.class_time >= window_start,
+                GroupClass.class_time <= window_end,
+            )
+        ):
+            booked_classes.setdefault(member_id, []).append(class_time)
+        booked_sessions = {}
+        for member_id, start, end in session.query(
+            PersonalTrainingSession.member_id, PersonalTrainingSession.start_time, PersonalTrainingSession.end_time
+        ).filter(
+            PersonalTrainingSession.member_id.in_(member_ids),
+            PersonalTrainingSession.status == "SCHEDULED",
+            PersonalTrainingSession.start_time < window_end,
+            PersonalTrainingSession.end_time > window_start,
+        ):
+            booked_sessions.setdefault(member_id, []).append((start, end))
+
+        # Classes with a waitlist have no seats for newcomers; freed seats go to the queue
+        seats_left = {
+            cid: gc.capacity - gc.enrolled_count if gc.waitlist_count == 0 else 0 for cid, gc in classes.items()
+        }
+        seen = set()
+        results = []
+        accepted = []
+        for member_id, class_id in pairs:
+            gc = classes.get(class_id)
+            error = None
+            if (member_id, class_id) in seen:
+                error = "Duplicate registration in request"
+            elif member_id not in known_members:
+                error = "Member not found"
+            elif not gc or gc.status != "SCHEDULED":
+                error = "Class not available"
+            elif gc.class_time <= now:
+                error = "Class is in the past"
+            elif (member_id, class_id) in existing:
+                error = "Already registered"
+            elif (member_id, class_id) in waiting:
+                error = "Already on the waitlist"
+            elif seats_left[class_id] <= 0:
+                error = "Class is full"
+            else:
+                # Same 1 hour window rule as member_has_time_conflict
+                lo = gc.class_time - timedelta(hours=1)
+                hi = gc.class_time + timedelta(hours=1)
+                if any(lo <= t <= hi for t in booked_classes.get(member_id, [])) or any(
+                    start < hi and end > lo for start, end in booked_sessions.get(member_id, [])
+                ):
+                    error = "Schedule conflict with another class or PT session"
+            seen.add((member_id, class_id))
+            if error:
+                results.append({"member_id": member_id, "class_id": class_id, "status": "rejected", "error": error})
+                continue
+            seats_left[class_id] -= 1
+            booked_classes.setdefault(member_id, []).append(gc.class_time)
+            accepted.append((member_id, class_id))
+            results.append({"member_id": member_id, "class_id": class_id, "status": "registered"})
+
+        if accepted and (mode == "best_effort" or len(accepted) == len(pairs)):
+            stmt = (
+                pg_insert(ClassRegistration)
+                .values([{"member_id": member_id, "class_id": class_id} for member_id, class_id in accepted])
+                .on_conflict_do_nothing(index_elements=[ClassRegistration.member_id, ClassRegistration.class_id])
+                .returning(ClassRegistration.member_id, ClassRegistration.class_id)
+            )
+            try:
+                inserted = {tuple(row) for row in session.execute(stmt)}
+            except IntegrityError:
+                # e.g. a member deleted concurrently; nothing was applied
+                session.rollback()
+                for r in results:
+                    if r["status"] == "registered":
+                        r["status"] = "not_applied"
+                return jsonify({"error": "Registrations changed concurrently; retry", "results": results}), 409
+            for r in results:
+                if r["status"] == "registered" and (r["member_id"], r["class_id"]) not in inserted:
+                    # A concurrent registration for the same member and class committed first
+                    r.update(status="rejected", error="Already registered")
+            accepted = [pair for pair in accepted if pair in inserted]
+
+        rejected = len(pairs) - len(accepted)
+        if mode == "all_or_nothing" and rejected:
+            session.rollback()
+            for r in results:
+                if r["status"] == "registered":
+                    r["status"] = "not_applied"
+            return jsonify({"registered": 0, "rejected": rejected, "results": results}), 400
+
+        if accepted:
+            for class_id, added in Counter(class_id for _, class_id in accepted).items():
+                classes[class_id].enrolled_count += added
+            refresh_member_summaries(session, {member_id for member_id, _ in accepted})
+        return (
+            jsonify({"registered": len(accepted), "rejected": rejected, "results": results}),
+            201 if accepted else 400,
+        )
+
+
 @app.route("/classes/unregister", methods=["POST"])
 @require_role("member", "admin")
 def unregister_class():
@@ -550,6 +1377,8 @@ def unregister_class():
     if auth["role"] == "member" and auth.get("member_id") != member_id:
         return jsonify({"error": "Forbidden"}), 403
     with get_session() as session:
+        # Serialise with other registrations for this class before the seat changes hands
+        group_class = session.get(GroupClass, class_id, with_for_update=True)
         reg = (
             session.query(ClassRegistration)
             .filter(ClassRegistration.member_id == member_id, ClassRegistration.class_id == class_id)
@@ -557,6 +1386,20 @@ def unregister_class():
         )
         if reg:
             session.delete(reg)
+            promoted = promote_from_waitlist(session, group_class)
+            if promoted is None:
+                release_class_seat(session, class_id)
+            refresh_member_summaries(session, [member_id, promoted])
+            return jsonify({"message": "Unregistered successfully", "promoted_member_id": promoted}), 200
+
+        waiting = (
+            session.query(ClassWaitlist)
+            .filter(ClassWaitlist.member_id == member_id, ClassWaitlist.class_id == class_id)
+            .first()
+        )
+        if waiting:
+            session.delete(waiting)
+            release_waitlist_spot(session, class_id)
         return jsonify({"message": "Unregistered successfully"}), 200
 
 
@@ -825,6 +1668,127 @@ def member_has_time_conflict(session, member_id, class_time):
     return class_conflict or pt_conflict
 
 
+def reserve_class_seat(session, class_id):
+    """Increment enrolled_count if a seat is free; return the new count or None when full.
+
+    Nobody is seated ahead of a non-empty waitlist; free seats go to waiting members first.
+    """
+    return session.execute(
+        update(GroupClass)
+        .where(
+            GroupClass.class_id == class_id,
+            GroupClass.enrolled_count < GroupClass.capacity,
+            GroupClass.waitlist_count == 0,
+        )
+        .values(enrolled_count=GroupClass.enrolled_count + 1)
+        .returning(GroupClass.enrolled_count),
+        execution_options={"synchronize_session": False},
+    ).scalar()
+
+
+def release_class_seat(session, class_id):
+    """Give a seat back after a registration is removed."""
+    session.execute(
+        update(GroupClass)
+        .where(GroupClass.class_id == class_id, GroupClass.enrolled_count > 0)
+        .values(enrolled_count=GroupClass.enrolled_count - 1),
+        execution_options={"synchronize_session": False},
+    )
+
+
+def reserve_waitlist_spot(session, class_id):
+    """Increment waitlist_count if the bounded waitlist has room; return the new count or None."""
+    return session.execute(
+        update(GroupClass)
+        .where(GroupClass.class_id == class_id, GroupClass.waitlist_count < CLASS_WAITLIST_LIMIT)
+        .values(waitlist_count=GroupClass.waitlist_count + 1)
+        .returning(GroupClass.waitlist_count),
+        execution_options={"synchronize_session": False},
+    ).scalar()
+
+
+def release_waitlist_spot(session, class_id):
+    session.execute(
+        update(GroupClass)
+        .where(GroupClass.class_id == class_id, GroupClass.waitlist_count > 0)
+        .values(waitlist_count=GroupClass.waitlist_count - 1),
+        execution_options={"synchronize_session": False},
+    )
+
+
+def promote_from_waitlist(session, group_class):
+    """Hand a freed seat to the longest-waiting member; return their id or None.
+
+    The caller holds the class row lock, so the seat is transferred inside the same
+    transaction, enrolled_count never dips below capacity and concurrent registrants
+    cannot jump the queue. Members who have since booked something overlapping the
+    class are passed over and keep their place on the waitlist. Nobody is promoted
+    into a class that is cancelled or has already started.
+    """
+    if group_class.status != "SCHEDULED" or group_class.class_time <= datetime.utcnow():
+        return None
+    entries = (
+        session.query(ClassWaitlist)
+        .filter(ClassWaitlist.class_id == group_class.class_id)
+        .order_by(ClassWaitlist.waitlist_id)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for entry in entries:
+        if member_has_time_conflict(session, entry.member_id, group_class.class_time):
+            continue
+        session.delete(entry)
+        release_waitlist_spot(session, group_class.class_id)
+        session.add(ClassRegistration(member_id=entry.member_id, class_id=group_class.class_id))
+        session.flush()
+        return entry.member_id
+    return None
+
+
+def fill_open_seats(session, group_class):
+    """Promote waitlisted members into the class's free seats; return their ids in order.
+
+    The caller holds the class row lock and ``group_class`` reflects the locked row.
+    """
+    promoted = []
+    while group_class.enrolled_count + len(promoted) < group_class.capacity:
+        member_id = promote_from_waitlist(session, group_class)
+        if member_id is None:
+            break
+        promoted.append(member_id)
+    if promoted:
+        session.execute(
+            update(GroupClass)
+            .where(GroupClass.class_id == group_class.class_id)
+            .values(enrolled_count=GroupClass.enrolled_count + len(promoted)),
+            execution_options={"synchronize_session": False},
+        )
+    return promoted
+
+
+def reconcile_enrolled_counts(session):
+    """Repair enrolled/waitlist counter drift against the source tables; return the fixed class ids."""
+    actual = (
+        select(func.count(ClassRegistration.member_id))
+        .where(ClassRegistration.class_id == GroupClass.class_id)
+        .correlate(GroupClass)
+        .scalar_subquery()
+    )
+    actual_waiting = (
+        select(func.count(ClassWaitlist.waitlist_id))
+        .where(ClassWaitlist.class_id == GroupClass.class_id)
+        .correlate(GroupClass)
+        .scalar_subquery()
+    )
+    return session.scalars(
+        update(GroupClass)
+        .where(or_(GroupClass.enrolled_count != actual, GroupClass.waitlist_count != actual_waiting))
+        .values(enrolled_count=actual, waitlist_count=actual_waiting)
+        .returning(GroupClass.class_id),
+        execution_options={"synchronize_session": False},
+    ).all()
+
+
 def room_has_class_conflict(session, room_id, start_time, end_time, exclude_class_id=None):
     """Return True if the room is occupied by a class overlapping the interval."""
     if not room_id:
@@ -850,6 +1814,7 @@ def room_has_class_conflict(session, room_id, start_time, end_time, exclude_clas
 
 @app.route("/pt-sessions", methods=["POST"])
 @require_role("member", "trainer", "admin")
+@idempotent
 def create_pt_session():
     data = request.get_json()
     auth = g.current_auth
@@ -870,6 +1835,8 @@ def create_pt_session():
             return jsonify({"error": "Session must be in the future"}), 400
         if room_has_class_conflict(session, data.get("room_id"), start_time, end_time):
             return jsonify({"error": "Room has a scheduled class in that interval"}), 400
+        if room_blocked_by_equipment(session, data.get("room_id")):
+            return jsonify({"error": "Room has critical equipment out of service"}), 400
         conflict = validate_pt_conflicts(
             session,
             member_id=data["member_id"],
@@ -892,7 +1859,7 @@ def create_pt_session():
             status="SCHEDULED",
         )
         session.add(pt)
-        session.flush()
+        refresh_member_summaries(session, [pt.member_id])
         return jsonify(pt_session_dict(pt)), 201
 
 
@@ -916,6 +1883,8 @@ def reschedule_pt_session(session_id):
             return jsonify({"error": "Session must be in the future"}), 400
         if room_has_class_conflict(session, data.get("room_id", pt.room_id), start_time, end_time):
             return jsonify({"error": "Room has a scheduled class in that interval"}), 400
+        if room_blocked_by_equipment(session, data.get("room_id", pt.room_id)):
+            return jsonify({"error": "Room has critical equipment out of service"}), 400
         conflict = validate_pt_conflicts(
             session,
             member_id=pt.member_id,
@@ -933,6 +1902,7 @@ def reschedule_pt_session(session_id):
         pt.room_id = data.get("room_id", pt.room_id)
         pt.session_type = data.get("session_type", pt.session_type)
         pt.notes = data.get("notes", pt.notes)
+        refresh_member_summaries(session, [pt.member_id])
         return jsonify(pt_session_dict(pt)), 200
 
 
@@ -949,6 +1919,7 @@ def cancel_pt_session(session_id):
         if auth["role"] == "trainer" and auth.get("trainer_id") != pt.trainer_id:
             return jsonify({"error": "Forbidden"}), 403
         pt.status = "CANCELLED"
+        refresh_member_summaries(session, [pt.member_id])
         return jsonify({"message": "Session cancelled"})
 
 
@@ -970,6 +1941,77 @@ def member_pt_sessions(member_id):
 
 
 # ---- Admin/general endpoints ----
+def room_readiness(session):
+    """Equipment status counts per room from one grouped query, keyed by room_id.
+
+    The result is cached per process for ROOM_READINESS_TTL_SECONDS and dropped
+    whenever rooms, equipment or maintenance statuses change in this process.
+    """
+    cached = room_readiness_cache.get("rooms")
+    if cached and (datetime.utcnow() - cached[0]).total_seconds() < ROOM_READINESS_TTL_SECONDS:
+        return cached[1]
+    status = func.coalesce(Equipment.status, EQUIPMENT_STATUS_UNKNOWN)
+    rows = session.execute(
+        select(
+            Room.room_id,
+            Room.room_name,
+            status,
+            func.count(Equipment.equipment_id),
+            func.count(Equipment.equipment_id).filter(Equipment.is_critical),
+        )
+        .outerjoin(Equipment, Equipment.room_id == Room.room_id)
+        .group_by(Room.room_id, Room.room_name, status)
+        .order_by(Room.room_name)
+    ).all()
+    readiness = {}
+    for room_id, room_name, status, count, critical in rows:
+        room = readiness.setdefault(
+            room_id,
+            {
+                "room_id": room_id,
+                "room_name": room_name,
+                "equipment": 0,
+                "status_counts": {},
+                "critical_out_of_service": 0,
+            },
+        )
+        if not count:
+            # Rooms without equipment come back as a single empty group
+            continue
+        room["equipment"] += count
+        room["status_counts"][status] = count
+        if status != EQUIPMENT_OPERATIONAL:
+            room["critical_out_of_service"] += critical
+    for room in readiness.values():
+        room["operational"] = room["status_counts"].get(EQUIPMENT_OPERATIONAL, 0)
+        room["ready"] = room["critical_out_of_service"] == 0
+    room_readiness_cache["rooms"] = (datetime.utcnow(), readiness)
+    return readiness
+
+
+def clear_room_readiness_on_commit(session):
+    """Drop the readiness snapshot once ``session`` commits.
+
+    Clearing earlier would let a concurrent reader re-cache the pre-commit state.
+    """
+    event.listen(session, "after_commit", lambda _: room_readiness_cache.clear(), once=True)
+
+
+def room_blocked_by_equipment(session, room_id):
+    """True when PT_REQUIRE_CRITICAL_EQUIPMENT is on and the room has critical equipment down."""
+    if not PT_REQUIRE_CRITICAL_EQUIPMENT or not room_id:
+        return False
+    readiness = room_readiness(session).get(room_id)
+    return bool(readiness and readiness["critical_out_of_service"])
+
+
+@app.route("/rooms/readiness", methods=["GET"])
+@require_role("trainer", "admin")
+def list_room_readiness():
+    with get_session() as session:
+        return jsonify(list(room_readiness(session).values()))
+
+
 @app.route("/rooms", methods=["GET"])
 @require_role("member", "trainer", "admin")
 def list_rooms():
@@ -988,6 +2030,7 @@ def create_room():
         room = Room(room_name=data["room_name"], capacity=data["capacity"])
         session.add(room)
         session.flush()
+        clear_room_readiness_on_commit(session)
         return jsonify({"room_id": room.room_id}), 201
 
 
@@ -1001,6 +2044,7 @@ def update_room(room_id):
             return jsonify({"error": "Room not found"}), 404
         room.room_name = data.get("room_name", room.room_name)
         room.capacity = data.get("capacity", room.capacity)
+        clear_room_readiness_on_commit(session)
         return jsonify({"message": "Updated"})
 
 
@@ -1010,7 +2054,43 @@ def delete_room(room_id):
     with get_session() as session:
         room = session.get(Room, room_id)
         if room:
+            # Derived rows the database cascade can't reach: summaries of members
+            # with classes or sessions in the room, and its maintenance counters
+            session.execute(
+                update(MemberSummary)
+                .where(
+                    or_(
+                        MemberSummary.member_id.in_(
+                            select(ClassRegistration.member_id)
+                            .join(GroupClass, GroupClass.class_id == ClassRegistration.class_id)
+                            .where(GroupClass.room_id == room_id)
+                        ),
+                        MemberSummary.member_id.in_(
+                            select(PersonalTrainingSession.member_id).where(PersonalTrainingSession.room_id == room_id)
+                        ),
+                    )
+                )
+                .values(refresh_after=datetime.utcnow()),
+                execution_options={"synchronize_session": False},
+            )
+            session.execute(
+                delete(MaintenanceStats).where(
+                    or_(
+                        and_(MaintenanceStats.scope == "room", MaintenanceStats.scope_id == room_id),
+                        and_(
+                            MaintenanceStats.scope == "equipment",
+                            MaintenanceStats.scope_id.in_(
+                                select(Equipment.equipment_id).where(Equipment.room_id == room_id)
+                            ),
+                        ),
+                    )
+                ),
+                execution_options={"synchronize_session": False},
+            )
+            # With passive_deletes this is a single DELETE; classes, sessions,
+            # equipment and their logs go through ON DELETE CASCADE
             session.delete(room)
+            clear_room_readiness_on_commit(session)
             return jsonify({"message": "Deleted"})
         return jsonify({"error": "Room not found"}), 404
 
@@ -1063,12 +2143,256 @@ def admin_create_class():
         return jsonify({"class_id": gc.class_id}), 201
 
 
+WEEKDAY_NAMES = ["MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN"]
+
+
+def expand_weekly_occurrences(rule):
+    """Expand a weekly recurrence rule into a sorted list of class datetimes."""
+    weekdays = set()
+    for day in rule["weekdays"]:
+        if isinstance(day, int):
+            if not 0 <= day <= 6:
+                raise ValueError(f"Invalid weekday {day}")
+            weekdays.add(day)
+        else:
+            key = str(day).strip().upper()[:3]
+            if key not in WEEKDAY_NAMES:
+                raise ValueError(f"Invalid weekday {day}")
+            weekdays.add(WEEKDAY_NAMES.index(key))
+    if not weekdays:
+        raise ValueError("At least one weekday required")
+
+    start_date = datetime.fromisoformat(rule["start_date"]).date()
+    end_date = datetime.fromisoformat(rule["end_date"]).date()
+    if start_date > end_date:
+        raise ValueError("start_date must be on or before end_date")
+    if (end_date - start_date).days >= CLASS_SERIES_MAX_DAYS:
+        raise ValueError(f"A series can span at most {CLASS_SERIES_MAX_DAYS} days")
+    time_of_day = datetime.strptime(rule["time"], "%H:%M").time()
+    exceptions = {datetime.fromisoformat(d).date() for d in rule.get("exceptions", [])}
+
+    occurrences = []
+    day = start_date
+    while day <= end_date:
+        if day.weekday() in weekdays and day not in exceptions:
+            occurrences.append(datetime.combine(day, time_of_day))
+        day += timedelta(days=1)
+    return occurrences
+
+
+@app.route("/admin/class-series", methods=["POST"])
+@require_role("admin")
+def admin_create_class_series():
+    data = request.get_json()
+    if not data.get("class_name") or not data.get("recurrence"):
+        return jsonify({"error": "class_name and recurrence required"}), 400
+    try:
+        occurrences = expand_weekly_occurrences(data["recurrence"])
+    except (KeyError, TypeError, ValueError) as exc:
+        return jsonify({"error": f"Invalid recurrence: {exc}"}), 400
+    if not occurrences:
+        return jsonify({"error": "Recurrence produces no occurrences"}), 400
+
+    trainer_id = data.get("trainer_id")
+    room_id = data.get("room_id")
+    range_start = occurrences[0]
+    range_end = occurrences[-1] + timedelta(hours=1)
+
+    with get_session() as session:
+        # Load every interval that could conflict with the series in one query each,
+        # then check all occurrences in memory instead of querying per class.
+        slots = (
+            session.query(TrainerAvailability.start_time, TrainerAvailability.end_time)
+            .filter(
+                TrainerAvailability.trainer_id == trainer_id,
+                TrainerAvailability.start_time <= occurrences[-1],
+                TrainerAvailability.end_time >= range_start,
+            )
+            .all()
+            if trainer_id
+            else []
+        )
+        pt_bookings = (
+            session.query(PersonalTrainingSession.start_time, PersonalTrainingSession.end_time)
+            .filter(
+                PersonalTrainingSession.room_id == room_id,
+                PersonalTrainingSession.status == "SCHEDULED",
+                PersonalTrainingSession.start_time < range_end,
+                PersonalTrainingSession.end_time > range_start,
+            )
+            .all()
+            if room_id
+            else []
+        )
+
+        now = datetime.utcnow()
+        accepted = []
+        rejected = []
+        for class_time in occurrences:
+            class_end = class_time + timedelta(hours=1)
+            if class_time <= now:
+                reason = "Class time must be in the future"
+            elif trainer_id and not any(s <= class_time <= e for s, e in slots):
+                reason = "Trainer not available at that time"
+            elif room_id and any(s < class_end and e > class_time for s, e in pt_bookings):
+                reason = "Room has a PT session in that interval"
+            else:
+                accepted.append(class_time)
+                continue
+            rejected.append({"class_time": class_time.isoformat(), "error": reason})
+
+        class_ids = []
+        if accepted:
+            class_ids = session.scalars(
+                insert(GroupClass).returning(GroupClass.class_id, sort_by_parameter_order=True),
+                [
+                    {
+                        "class_name": data["class_name"],
+                        "trainer_id": trainer_id,
+                        "room_id": room_id,
+                        "class_time": class_time,
+                        "capacity": data.get("capacity", 10),
+                        "status": data.get("status", "SCHEDULED"),
+                    }
+                    for class_time in accepted
+                ],
+            ).all()
+
+        return (
+            jsonify(
+                {
+                    "created": [
+                        {"class_id": cid, "class_time": ct.isoformat()} for cid, ct in zip(class_ids, accepted)
+                    ],
+                    "rejected": rejected,
+                }
+            ),
+            201 if accepted else 400,
+        )
+
+
+@app.route("/admin/class-schedule/plan", methods=["POST"])
+@require_role("admin")
+def admin_plan_class_schedule():
+    data = request.get_json()
+    raw_classes = data.get("classes") or []
+    if not raw_classes:
+        return jsonify({"error": "At least one class request required"}), 400
+    try:
+        class_requests = [
+            {
+                "class_name": c["class_name"],
+                "window_start": datetime.fromisoformat(c["window_start"]),
+                "window_end": datetime.fromisoformat(c["window_end"]),
+                "capacity": int(c.get("capacity", 10)),
+                "certification": c.get("certification"),
+            }
+            for c in raw_classes
+        ]
+    except (KeyError, TypeError, ValueError) as exc:
+        return jsonify({"error": f"Invalid class request: {exc}"}), 400
+
+    now = datetime.utcnow()
+    for req in class_requests:
+        req["window_start"] = max(req["window_start"], now)
+    range_start = min(r["window_start"] for r in class_requests)
+    range_end = max(r["window_end"] for r in class_requests)
+
+    with get_session() as session:
+        rooms = session.query(Room.room_id, Room.capacity).all()
+        trainers = session.query(Trainer.trainer_id, Trainer.certification).all()
+        availability = (
+            session.query(TrainerAvailability.trainer_id, TrainerAvailability.start_time, TrainerAvailability.end_time)
+            .filter(TrainerAvailability.start_time < range_end, TrainerAvailability.end_time > range_start)
+            .all()
+        )
+        pt_sessions = (
+            session.query(
+                PersonalTrainingSession.room_id,
+                PersonalTrainingSession.trainer_id,
+                PersonalTrainingSession.start_time,
+                PersonalTrainingSession.end_time,
+            )
+            .filter(
+                PersonalTrainingSession.status == "SCHEDULED",
+                PersonalTrainingSession.start_time < range_end,
+                PersonalTrainingSession.end_time > range_start,
+            )
+            .all()
+        )
+        classes = (
+            session.query(GroupClass.room_id, GroupClass.trainer_id, GroupClass.class_time)
+            .filter(
+                GroupClass.status == "SCHEDULED",
+                GroupClass.class_time < range_end,
+                GroupClass.class_time > range_start - timedelta(hours=1),
+            )
+            .all()
+        )
+        room_bookings = [(p.room_id, p.start_time, p.end_time) for p in pt_sessions if p.room_id]
+        room_bookings += [(c.room_id, c.class_time, c.class_time + timedelta(hours=1)) for c in classes if c.room_id]
+        trainer_bookings = [(p.trainer_id, p.start_time, p.end_time) for p in pt_sessions]
+        trainer_bookings += [
+            (c.trainer_id, c.class_time, c.class_time + timedelta(hours=1)) for c in classes if c.trainer_id
+        ]
+
+        assignments, unassigned = plan_class_schedule(
+            class_requests,
+            [tuple(r) for r in rooms],
+            [tuple(t) for t in trainers],
+            [tuple(a) for a in availability],
+            room_bookings,
+            trainer_bookings,
+        )
+
+        planned = [
+            {
+                "request_index": idx,
+                "class_name": class_requests[idx]["class_name"],
+                "class_time": a["class_time"].isoformat(),
+                "room_id": a["room_id"],
+                "trainer_id": a["trainer_id"],
+                "capacity": class_requests[idx]["capacity"],
+                "room_capacity_slack": a["waste"],
+            }
+            for idx, a in sorted(assignments.items())
+        ]
+        if data.get("commit") and planned:
+            class_ids = session.scalars(
+                insert(GroupClass).returning(GroupClass.class_id, sort_by_parameter_order=True),
+                [
+                    {
+                        "class_name": p["class_name"],
+                        "trainer_id": p["trainer_id"],
+                        "room_id": p["room_id"],
+                        "class_time": assignments[p["request_index"]]["class_time"],
+                        "capacity": p["capacity"],
+                        "status": "SCHEDULED",
+                    }
+                    for p in planned
+                ],
+            ).all()
+            for p, class_id in zip(planned, class_ids):
+                p["class_id"] = class_id
+
+        return jsonify(
+            {
+                "assignments": planned,
+                "unassigned": [
+                    {"request_index": idx, "class_name": class_requests[idx]["class_name"]} for idx in unassigned
+                ],
+                "committed": bool(data.get("commit")),
+            }
+        )
+
+
 @app.route("/admin/classes/<int:class_id>", methods=["PUT"])
 @require_role("admin")
 def admin_update_class(class_id):
     data = request.get_json()
     with get_session() as session:
-        gc = session.get(GroupClass, class_id)
+        # Locked like registrations, since a capacity change can hand out seats
+        gc = session.get(GroupClass, class_id, with_for_update=True)
         if not gc:
             return jsonify({"error": "Class not found"}), 404
         new_time = datetime.fromisoformat(data["class_time"]) if "class_time" in data else gc.class_time
@@ -1105,7 +2429,20 @@ def admin_update_class(class_id):
             gc.capacity = data["capacity"]
         if "status" in data:
             gc.status = data["status"]
-        return jsonify({"message": "Updated"})
+        if "class_time" in data or "status" in data:
+            mark_class_members_stale(session, class_id)
+        promoted = fill_open_seats(session, gc)
+        if promoted:
+            refresh_member_summaries(session, promoted)
+        return jsonify({"message": "Updated", "promoted_member_ids": promoted})
+
+
+@app.route("/admin/classes/reconcile-enrollment", methods=["POST"])
+@require_role("admin")
+def admin_reconcile_enrollment():
+    with get_session() as session:
+        repaired = reconcile_enrolled_counts(session)
+        return jsonify({"repaired_class_ids": repaired})
 
 
 @app.route("/admin/classes/<int:class_id>/cancel", methods=["POST"])
@@ -1116,6 +2453,7 @@ def admin_cancel_class(class_id):
         if not gc:
             return jsonify({"error": "Class not found"}), 404
         gc.status = "CANCELLED"
+        mark_class_members_stale(session, class_id)
         return jsonify({"message": "Cancelled"})
 
 
@@ -1131,6 +2469,7 @@ def list_equipment():
                     "equipment_name": e.equipment_name,
                     "status": e.status,
                     "room_id": e.room_id,
+                    "is_critical": e.is_critical,
                 }
                 for e in items
             ]
@@ -1141,50 +2480,225 @@ def list_equipment():
 @require_role("admin")
 def create_equipment():
     data = request.get_json()
+    status = parse_equipment_status(data.get("status", EQUIPMENT_OPERATIONAL))
+    if status is None:
+        return jsonify({"error": f"status must be one of {', '.join(EQUIPMENT_STATUSES)}"}), 400
     with get_session() as session:
         eq = Equipment(
             room_id=data.get("room_id"),
             equipment_name=data["equipment_name"],
-            status=data.get("status", "OPERATIONAL"),
+            status=status,
+            is_critical=bool(data.get("is_critical", False)),
         )
         session.add(eq)
         session.flush()
+        clear_room_readiness_on_commit(session)
         return jsonify({"equipment_id": eq.equipment_id}), 201
 
 
+def maintenance_log_dict(l: MaintenanceLog):
+    return {
+        "log_id": l.log_id,
+        "equipment_id": l.equipment_id,
+        "issue_description": l.issue_description,
+        "status": l.status,
+        "created_at": l.created_at.isoformat() if l.created_at else None,
+        "resolved_timestamp": l.resolved_timestamp.isoformat() if l.resolved_timestamp else None,
+        "resolution_notes": l.resolution_notes,
+    }
+
+
 @app.route("/admin/maintenance", methods=["GET"])
 @require_role("admin")
 def list_maintenance():
     with get_session() as session:
         logs = session.query(MaintenanceLog).order_by(MaintenanceLog.created_at.desc()).all()
+        return jsonify([maintenance_log_dict(l) for l in logs])
+
+
+def parse_equipment_status(value):
+    """Uppercase a requested equipment status; None when it is not a known status."""
+    status = str(value).strip().upper()
+    return status if status in EQUIPMENT_STATUSES else None
+
+
+def parse_maintenance_status(value):
+    """Uppercase a requested log status; None when it is not a known status."""
+    status = str(value).strip().upper()
+    return status if status in MAINTENANCE_STATUSES else None
+
+
+@app.route("/admin/maintenance/queue", methods=["GET"])
+@require_role("admin")
+def maintenance_queue():
+    """Unresolved logs, oldest first, optionally narrowed by status and room."""
+    status = request.args.get("status", "").strip().upper()
+    if status == MAINTENANCE_RESOLVED:
+        return jsonify({"error": "The queue only holds unresolved logs"}), 400
+    if status and status not in MAINTENANCE_STATUSES:
+        return jsonify({"error": f"status must be one of {', '.join(MAINTENANCE_STATUSES)}"}), 400
+    try:
+        room_id = int(request.args["room_id"]) if request.args.get("room_id") else None
+        limit = min(int(request.args.get("limit", 50)), 200)
+        offset = max(int(request.args.get("offset", 0)), 0)
+    except ValueError:
+        return jsonify({"error": "room_id, limit and offset must be integers"}), 400
+
+    with get_session() as session:
+        # Matches the partial index on open logs
+        query = (
+            session.query(MaintenanceLog, Equipment.equipment_name, Equipment.room_id)
+            .join(Equipment, Equipment.equipment_id == MaintenanceLog.equipment_id)
+            .filter(MaintenanceLog.status != MAINTENANCE_RESOLVED)
+        )
+        if status:
+            query = query.filter(MaintenanceLog.status == status)
+        if room_id is not None:
+            query = query.filter(Equipment.room_id == room_id)
+        rows = query.order_by(MaintenanceLog.created_at, MaintenanceLog.log_id).limit(limit).offset(offset).all()
+        return jsonify(
+            [
+                {**maintenance_log_dict(log), "equipment_name": equipment_name, "room_id": log_room_id}
+                for log, equipment_name, log_room_id in rows
+            ]
+        )
+
+
+# ts_headline delimits matches with control characters and keeps snippets short;
+# mark_headline escapes the log text and only then turns them into <mark> tags
+HEADLINE_START, HEADLINE_STOP = "\x02", "\x03"
+MAINTENANCE_HEADLINE_OPTIONS = f"StartSel={HEADLINE_START}, StopSel={HEADLINE_STOP}, MaxWords=30, MinWords=10"
+
+
+def mark_headline(headline):
+    """HTML-escape a ts_headline snippet and wrap its matches in <mark>."""
+    if headline is None:
+        return None
+    return html.escape(headline).replace(HEADLINE_START, "<mark>").replace(HEADLINE_STOP, "</mark>")
+
+
+@app.route("/admin/maintenance/search", methods=["GET"])
+@require_role("admin")
+def search_maintenance():
+    q = request.args.get("q", "").strip()
+    if not q:
+        return jsonify({"error": "q query required"}), 400
+    try:
+        limit = min(int(request.args.get("limit", 20)), 100)
+        offset = max(int(request.args.get("offset", 0)), 0)
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+
+    tsquery = func.websearch_to_tsquery("english", q)
+    rank = func.ts_rank_cd(MaintenanceLog.search_vector, tsquery)
+    with get_session() as session:
+        rows = (
+            session.query(
+                MaintenanceLog,
+                Equipment.equipment_name,
+                rank.label("rank"),
+                func.ts_headline(
+                    "english",
+                    func.coalesce(MaintenanceLog.issue_description, ""),
+                    tsquery,
+                    MAINTENANCE_HEADLINE_OPTIONS,
+                ).label("issue_highlight"),
+                func.ts_headline(
+                    "english",
+                    func.coalesce(MaintenanceLog.resolution_notes, ""),
+                    tsquery,
+                    MAINTENANCE_HEADLINE_OPTIONS,
+                ).label("resolution_highlight"),
+                func.count().over().label("total"),
+            )
+            .outerjoin(Equipment, Equipment.equipment_id == MaintenanceLog.equipment_id)
+            .filter(MaintenanceLog.search_vector.bool_op("@@")(tsquery))
+            .order_by(rank.desc(), MaintenanceLog.created_at.desc(), MaintenanceLog.log_id)
+            .limit(limit)
+            .offset(offset)
+            .all()
+        )
+        return jsonify(
+            {
+                "total": rows[0].total if rows else 0,
+                "limit": limit,
+                "offset": offset,
+                "results": [
+                    {
+                        **maintenance_log_dict(r.MaintenanceLog),
+                        "equipment_name": r.equipment_name,
+                        "rank": round(r.rank, 4),
+                        "issue_highlight": mark_headline(r.issue_highlight),
+                        "resolution_highlight": mark_headline(r.resolution_highlight),
+                    }
+                    for r in rows
+                ],
+            }
+        )
+
+
+@app.route("/admin/maintenance/stats", methods=["GET"])
+@require_role("admin")
+def maintenance_stats():
+    scope = request.args.get("scope", "equipment")
+    if scope not in ("equipment", "room"):
+        return jsonify({"error": "scope must be equipment or room"}), 400
+    with get_session() as session:
+        rows = (
+            session.query(MaintenanceStats)
+            .filter(MaintenanceStats.scope == scope)
+            .order_by(MaintenanceStats.open_count.desc(), MaintenanceStats.scope_id)
+            .all()
+        )
         return jsonify(
             [
                 {
-                    "log_id": l.log_id,
-                    "equipment_id": l.equipment_id,
-                    "issue_description": l.issue_description,
-                    "status": l.status,
-                    "created_at": l.created_at.isoformat() if l.created_at else None,
-                    "resolved_timestamp": l.resolved_timestamp.isoformat() if l.resolved_timestamp else None,
-                    "resolution_notes": l.resolution_notes,
+                    f"{scope}_id": r.scope_id,
+                    "open_count": r.open_count,
+                    "resolved_count": r.resolved_count,
+                    "mttr_hours": round(r.repair_seconds / r.resolved_count / 3600, 2) if r.resolved_count else None,
                 }
-                for l in logs
+                for r in rows
             ]
         )
 
 
+@app.route("/admin/maintenance/stats/reconcile", methods=["POST"])
+@require_role("admin")
+def reconcile_maintenance_stats():
+    with get_session() as session:
+        rows = rebuild_maintenance_stats(session)
+        return jsonify({"rows": rows})
+
+
 @app.route("/admin/equipment/<int:equipment_id>/maintenance", methods=["POST"])
 @require_role("admin")
 def create_maintenance(equipment_id):
     data = request.get_json()
+    status = parse_maintenance_status(data.get("status") or "OPEN")
+    if status is None:
+        return jsonify({"error": f"status must be one of {', '.join(MAINTENANCE_STATUSES)}"}), 400
+    equipment_status = None
+    if data.get("equipment_status") is not None:
+        equipment_status = parse_equipment_status(data["equipment_status"])
+        if equipment_status is None:
+            return jsonify({"error": f"equipment_status must be one of {', '.join(EQUIPMENT_STATUSES)}"}), 400
     with get_session() as session:
+        eq = session.get(Equipment, equipment_id)
+        if not eq:
+            return jsonify({"error": "Equipment not found"}), 404
         log = MaintenanceLog(
             equipment_id=equipment_id,
             issue_description=data.get("issue_description"),
-            status=data.get("status", "OPEN"),
+            status=status,
         )
         session.add(log)
         session.flush()
+        if log.status != MAINTENANCE_RESOLVED:
+            adjust_maintenance_stats(session, equipment_id, eq.room_id, open_delta=1)
+        if equipment_status:
+            eq.status = equipment_status
+        clear_room_readiness_on_commit(session)
         return jsonify({"log_id": log.log_id}), 201
 
 
@@ -1192,17 +2706,66 @@ def create_maintenance(equipment_id):
 @require_role("admin")
 def update_maintenance(log_id):
     data = request.get_json()
+    status = None
+    if data.get("status") is not None:
+        status = parse_maintenance_status(data["status"])
+        if status is None:
+            return jsonify({"error": f"status must be one of {', '.join(MAINTENANCE_STATUSES)}"}), 400
+    equipment_status = None
+    if data.get("equipment_status") is not None:
+        equipment_status = parse_equipment_status(data["equipment_status"])
+        if equipment_status is None:
+            return jsonify({"error": f"equipment_status must be one of {', '.join(EQUIPMENT_STATUSES)}"}), 400
     with get_session() as session:
-        log = session.get(MaintenanceLog, log_id)
+        # Row lock so two concurrent resolutions can't both count the repair
+        log = session.get(MaintenanceLog, log_id, with_for_update=True)
         if not log:
             return jsonify({"error": "Log not found"}), 404
-        log.status = data.get("status", log.status)
+        was_open = log.status.upper() != MAINTENANCE_RESOLVED
+        log.status = status or log.status.upper()
         log.resolution_notes = data.get("resolution_notes", log.resolution_notes)
-        if log.status.upper() == "RESOLVED" and not log.resolved_timestamp:
-            log.resolved_timestamp = datetime.utcnow()
+        room_id = log.equipment.room_id if log.equipment else None
+        if was_open and log.status == MAINTENANCE_RESOLVED:
+            log.resolved_timestamp = log.resolved_timestamp or datetime.utcnow()
+            repair = (log.resolved_timestamp - log.created_at).total_seconds() if log.created_at else 0
+            adjust_maintenance_stats(
+                session, log.equipment_id, room_id, open_delta=-1, resolved_delta=1, seconds_delta=repair
+            )
+        elif not was_open and log.status != MAINTENANCE_RESOLVED:
+            # Reopened: take the earlier repair back out of the averages
+            if log.resolved_timestamp and log.created_at:
+                repair = (log.resolved_timestamp - log.created_at).total_seconds()
+                adjust_maintenance_stats(
+                    session, log.equipment_id, room_id, open_delta=1, resolved_delta=-1, seconds_delta=-repair
+                )
+            else:
+                adjust_maintenance_stats(session, log.equipment_id, room_id, open_delta=1)
+            log.resolved_timestamp = None
+        if equipment_status and log.equipment:
+            log.equipment.status = equipment_status
+        clear_room_readiness_on_commit(session)
         return jsonify({"message": "Updated"})
 
 
+# ---- Bulk exports ----
+@app.route("/admin/exports/<table>", methods=["GET"])
+@require_role("admin")
+def admin_export_table(table):
+    fmt = request.args.get("format", "csv")
+    try:
+        validate_export(table, fmt)
+        start = datetime.fromisoformat(request.args["from"]) if request.args.get("from") else None
+        end = datetime.fromisoformat(request.args["to"]) if request.args.get("to") else None
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    extension = "csv" if fmt == "csv" else "pgcopy"
+    return Response(
+        stream_export(table, fmt, start, end),
+        mimetype="text/csv" if fmt == "csv" else "application/octet-stream",
+        headers={"Content-Disposition": f"attachment; filename={table}.{extension}"},
+    )
+
+
 # ---- Billing ----
 @app.route("/admin/invoices", methods=["GET"])
 @require_role("admin")
@@ -1245,44 +2808,114 @@ def create_invoice():
             )
         invoice.total_amount = total
         session.flush()
+        bump_change_version(session, "invoices")
         return jsonify(invoice_to_dict(invoice)), 201
 
 
+@app.route("/admin/billing-runs", methods=["POST"])
+@require_role("admin")
+def create_billing_run():
+    data = request.get_json() or {}
+    member_ids = data.get("member_ids")
+    if member_ids is not None and not all(isinstance(m, int) for m in member_ids):
+        return jsonify({"error": "member_ids must be a list of integers"}), 400
+    try:
+        report = run_billing(
+            data.get("period"),
+            data.get("items", []),
+            member_ids=member_ids,
+            due_days=int(data.get("due_days", 14)),
+            notes=data.get("notes"),
+        )
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(report), 201
+
+
+def parse_payment_amount(value):
+    """Return a positive, finite Decimal amount in whole cents, or None if ``value`` is not one.
+
+    Fractions of a cent are rejected rather than rounded: payments.amount would
+    round them while amount_paid is advanced by the exact value.
+    """
+    try:
+        amount = Decimal(str(value))
+    except InvalidOperation:
+        return None
+    if not amount.is_finite() or amount <= 0 or amount.normalize().as_tuple().exponent < -2:
+        return None
+    return amount
+
+
+def post_invoice_payment(session, inv: Invoice, amount, payment_method, reference=None):
+    """Record a payment against an invoice; return the Payment, or None if it would overpay.
+
+    amount_paid and status are advanced by a single conditional UPDATE, so the
+    invoice row stays locked until commit and concurrent postings cannot both
+    pass the total check. Posting cost does not grow with the number of payments.
+    Raises IntegrityError when ``reference`` has already been posted.
+    """
+    new_paid = Invoice.amount_paid + amount
+    posted = session.execute(
+        update(Invoice)
+        .where(Invoice.invoice_id == inv.invoice_id, new_paid <= Invoice.total_amount)
+        .values(
+            amount_paid=new_paid,
+            status=case((new_paid == Invoice.total_amount, "PAID"), else_="PARTIAL"),
+        )
+        .returning(Invoice.invoice_id),
+        execution_options={"synchronize_session": False},
+    ).scalar()
+    if posted is None:
+        return None
+    payment = Payment(
+        invoice_id=inv.invoice_id,
+        amount=amount,
+        payment_method=payment_method,
+        status="SUCCESS",
+        reference=reference,
+    )
+    session.add(payment)
+    session.flush()
+    record_payment_revenue(session, [payment.payment_id])
+    bump_change_version(session, "invoices")
+    session.refresh(inv)
+    return payment
+
+
 @app.route("/admin/invoices/<int:invoice_id>/payments", methods=["POST"])
 @require_role("admin")
+@idempotent
 def create_payment(invoice_id):
     data = request.get_json()
-    amount = Decimal(str(data["amount"]))
+    amount = parse_payment_amount(data.get("amount"))
+    if amount is None:
+        return jsonify({"error": "amount must be a positive number with at most 2 decimal places"}), 400
     with get_session() as session:
         inv = session.get(Invoice, invoice_id)
         if not inv:
             return jsonify({"error": "Invoice not found"}), 404
-
-        paid_so_far = (
-            session.query(func.coalesce(func.sum(Payment.amount), 0))
-            .filter(Payment.invoice_id == invoice_id)
-            .scalar()
-        )
-        if paid_so_far + amount > inv.total_amount:
+        try:
+            payment = post_invoice_payment(
+                session, inv, amount, data.get("payment_method", "CASH"), data.get("reference")
+            )
+        except IntegrityError:
+            session.rollback()
+            return jsonify({"error": "A payment with this reference already exists"}), 409
+        if not payment:
             return jsonify({"error": "Payment exceeds invoice total"}), 400
+        return jsonify(invoice_to_dict(inv)), 201
 
-        payment = Payment(
-            invoice_id=invoice_id,
-            amount=amount,
-            payment_method=data.get("payment_method", "CASH"),
-            status="SUCCESS",
-            reference=data.get("reference"),
-        )
-        session.add(payment)
-
-        new_total = paid_so_far + amount
-        if new_total == inv.total_amount:
-            inv.status = "PAID"
-        else:
-            inv.status = "PARTIAL"
 
-        session.flush()
-        return jsonify(invoice_to_dict(inv)), 201
+@app.route("/admin/reconciliation/import", methods=["POST"])
+@require_role("admin")
+def import_settlements():
+    """Reconcile a settlement CSV sent as the raw request body, read as a stream."""
+    try:
+        summary = reconcile_settlements(codecs.iterdecode(request.stream, "utf-8"))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(summary), 200
 
 
 @app.route("/members/<int:member_id>/invoices", methods=["GET"])
@@ -1298,40 +2931,282 @@ def member_invoices(member_id):
 
 @app.route("/members/<int:member_id>/invoices/<int:invoice_id>/payments", methods=["POST"])
 @require_role("member", "admin")
+@idempotent
 def member_pay_invoice(member_id, invoice_id):
     auth = g.current_auth
     if auth["role"] == "member" and auth.get("member_id") != member_id:
         return jsonify({"error": "Forbidden"}), 403
     data = request.get_json()
-    amount = Decimal(str(data["amount"]))
+    amount = parse_payment_amount(data.get("amount"))
+    if amount is None:
+        return jsonify({"error": "amount must be a positive number with at most 2 decimal places"}), 400
     with get_session() as session:
         inv = session.get(Invoice, invoice_id)
         if not inv or inv.member_id != member_id:
             return jsonify({"error": "Invoice not found"}), 404
-        paid_so_far = (
-            session.query(func.coalesce(func.sum(Payment.amount), 0))
-            .filter(Payment.invoice_id == invoice_id)
-            .scalar()
-        )
-        if paid_so_far + amount > inv.total_amount:
+        try:
+            payment = post_invoice_payment(
+                session, inv, amount, data.get("payment_method", "CARD"), data.get("reference")
+            )
+        except IntegrityError:
+            session.rollback()
+            return jsonify({"error": "A payment with this reference already exists"}), 409
+        if not payment:
             return jsonify({"error": "Payment exceeds invoice total"}), 400
+        return jsonify(invoice_to_dict(inv)), 201
 
-        payment = Payment(
-            invoice_id=invoice_id,
-            amount=amount,
-            payment_method=data.get("payment_method", "CARD"),
-            status="SUCCESS",
-            reference=data.get("reference"),
+
+# Upper bound (days past due, inclusive) of each aging bucket; None is open-ended
+AR_AGING_BUCKETS = [("days_0_30", 30), ("days_31_60", 60), ("days_61_90", 90), ("days_over_90", None)]
+# Per-day snapshots served when ?cached=true, keyed by as_of and tagged with the
+# "invoices" change version they were computed at. Every invoice or payment write,
+# including the billing and reconciliation CLIs, bumps that version in its own
+# transaction, so a snapshot is only reused while no write has committed since.
+ar_aging_cache = {}
+
+
+def ar_aging_report(session, as_of):
+    """Outstanding balance per member bucketed by days past due, in one grouped pass.
+
+    Invoices without a due date age from their issue date; invoices not yet due
+    fall in the first bucket.
+    """
+    outstanding = Invoice.total_amount - Invoice.amount_paid
+    age = type_coerce(literal(as_of, Date) - func.coalesce(Invoice.due_date, Invoice.issue_date), Integer)
+    bucket_columns = []
+    lower = None
+    for name, upper in AR_AGING_BUCKETS:
+        bounds = [age > lower] if lower is not None else []
+        if upper is not None:
+            bounds.append(age <= upper)
+        bucket_columns.append(func.coalesce(func.sum(outstanding).filter(and_(*bounds)), 0).label(name))
+        lower = upper
+    rows = session.execute(
+        select(
+            Invoice.member_id,
+            Member.first_name,
+            Member.last_name,
+            func.count().label("open_invoices"),
+            func.sum(outstanding).label("total"),
+            *bucket_columns,
         )
-        session.add(payment)
+        .join(Member, Member.member_id == Invoice.member_id)
+        .where(Invoice.amount_paid < Invoice.total_amount)
+        .group_by(Invoice.member_id, Member.first_name, Member.last_name)
+        .order_by(func.sum(outstanding).desc(), Invoice.member_id)
+    ).all()
+
+    bucket_names = [name for name, _ in AR_AGING_BUCKETS]
+    members = []
+    totals = dict.fromkeys(bucket_names + ["total"], 0.0)
+    for row in rows:
+        entry = {
+            "member_id": row.member_id,
+            "member_name": f"{row.first_name} {row.last_name}",
+            "open_invoices": row.open_invoices,
+        }
+        for name in bucket_names + ["total"]:
+            entry[name] = decimal_to_float(getattr(row, name))
+            totals[name] += entry[name]
+        members.append(entry)
+    return {
+        "as_of": as_of.isoformat(),
+        "totals": {name: round(value, 2) for name, value in totals.items()},
+        "members": members,
+    }
 
-        new_total = paid_so_far + amount
-        inv.status = "PAID" if new_total == inv.total_amount else "PARTIAL"
-        session.flush()
-        return jsonify(invoice_to_dict(inv)), 201
+
+@app.route("/admin/reports/ar-aging", methods=["GET"])
+@require_role("admin")
+def admin_ar_aging_report():
+    try:
+        as_of = date.fromisoformat(request.args["as_of"]) if request.args.get("as_of") else date.today()
+    except ValueError:
+        return jsonify({"error": "as_of must be an ISO date"}), 400
+    cached = request.args.get("cached", "false").lower() == "true"
+    with get_session() as session:
+        # Read before the report so a write committing in between makes the snapshot stale
+        version = current_change_version(session, "invoices")
+        if cached and as_of in ar_aging_cache and ar_aging_cache[as_of][0] == version:
+            return jsonify(ar_aging_cache[as_of][1])
+        report = ar_aging_report(session, as_of)
+    if cached:
+        ar_aging_cache.clear()
+        ar_aging_cache[as_of] = (version, report)
+    return jsonify(report)
+
+
+@app.route("/admin/reports/revenue", methods=["GET"])
+@require_role("admin")
+def admin_revenue_report():
+    group_by = request.args.get("group_by", "payment_method")
+    if group_by not in REVENUE_DIMENSIONS:
+        return jsonify({"error": f"group_by must be one of {', '.join(REVENUE_DIMENSIONS)}"}), 400
+    try:
+        start = date.fromisoformat(request.args["from"]) if request.args.get("from") else None
+        end = date.fromisoformat(request.args["to"]) if request.args.get("to") else None
+    except ValueError:
+        return jsonify({"error": "from/to must be ISO dates"}), 400
+
+    # Reads only the rollup, so cost depends on the range asked for, not on payment history
+    query = select(RevenueDaily).where(RevenueDaily.dimension == group_by)
+    if start:
+        query = query.where(RevenueDaily.day >= start)
+    if end:
+        query = query.where(RevenueDaily.day < end)
+    with get_session() as session:
+        rows = session.scalars(query.order_by(RevenueDaily.day, RevenueDaily.key)).all()
+        totals = {}
+        daily = []
+        for row in rows:
+            amount = decimal_to_float(row.amount)
+            daily.append({"day": row.day.isoformat(), "key": row.key, "amount": amount, "payments": row.payments})
+            total = totals.setdefault(row.key, {"key": row.key, "amount": 0.0, "payments": 0})
+            total["amount"] = round(total["amount"] + amount, 2)
+            total["payments"] += row.payments
+        return jsonify(
+            {
+                "group_by": group_by,
+                "from": start.isoformat() if start else None,
+                "to": end.isoformat() if end else None,
+                "totals": sorted(totals.values(), key=lambda t: -t["amount"]),
+                "daily": daily,
+            }
+        )
 
 
 # ---- Member dashboard summary ----
+SUMMARY_COLUMNS = [
+    "member_id",
+    "total_goals",
+    "active_goals",
+    "upcoming_class_count",
+    "past_class_count",
+    "upcoming_pt_session_count",
+    "past_pt_session_count",
+    "latest_weight",
+    "latest_heart_rate",
+    "latest_body_fat",
+    "latest_recorded_at",
+    "refresh_after",
+    "updated_at",
+]
+
+
+def member_summary_select(now):
+    """Select every member's dashboard numbers in one statement, in SUMMARY_COLUMNS order.
+
+    Every aggregate is a LATERAL subquery correlated to the member row, so the
+    caller narrows it with a plain WHERE on Member.
+    """
+    goals = (
+        select(
+            func.count().label("total_goals"),
+            func.count().filter(FitnessGoal.is_active.is_(True)).label("active_goals"),
+        )
+        .where(FitnessGoal.member_id == Member.member_id)
+        .lateral("goal_stats")
+    )
+    classes = (
+        select(
+            func.count().filter(GroupClass.class_time >= now).label("upcoming"),
+            func.count().filter(GroupClass.class_time < now, GroupClass.status == "SCHEDULED").label("past"),
+            func.min(GroupClass.class_time).filter(GroupClass.class_time >= now).label("next_change"),
+        )
+        .select_from(ClassRegistration)
+        .join(GroupClass, GroupClass.class_id == ClassRegistration.class_id)
+        .where(ClassRegistration.member_id == Member.member_id)
+        .lateral("class_stats")
+    )
+    scheduled = PersonalTrainingSession.status == "SCHEDULED"
+    sessions = (
+        select(
+            func.count().filter(scheduled, PersonalTrainingSession.start_time >= now).label("upcoming"),
+            func.count().filter(scheduled, PersonalTrainingSession.end_time < now).label("past"),
+            func.min(PersonalTrainingSession.start_time)
+            .filter(scheduled, PersonalTrainingSession.start_time >= now)
+            .label("next_start"),
+            func.min(PersonalTrainingSession.end_time)
+            .filter(scheduled, PersonalTrainingSession.end_time >= now)
+            .label("next_end"),
+        )
+        .where(PersonalTrainingSession.member_id == Member.member_id)
+        .lateral("session_stats")
+    )
+    latest = (
+        select(HealthMetric.weight, HealthMetric.heart_rate, HealthMetric.body_fat, HealthMetric.recorded_at)
+        .where(HealthMetric.member_id == Member.member_id)
+        .order_by(HealthMetric.recorded_at.desc())
+        .limit(1)
+        .lateral("latest_metric")
+    )
+    return (
+        select(
+            Member.member_id,
+            goals.c.total_goals,
+            goals.c.active_goals,
+            classes.c.upcoming,
+            classes.c.past,
+            sessions.c.upcoming,
+            sessions.c.past,
+            latest.c.weight,
+            latest.c.heart_rate,
+            latest.c.body_fat,
+            latest.c.recorded_at,
+            # LEAST ignores NULLs, so this is the earliest pending upcoming -> past transition
+            func.least(classes.c.next_change, sessions.c.next_start, sessions.c.next_end),
+            literal(now, DateTime),
+        )
+        .select_from(Member)
+        .join(goals, true())
+        .join(classes, true())
+        .join(sessions, true())
+        .outerjoin(latest, true())
+    )
+
+
+def refresh_member_summaries(session, member_ids=None):
+    """Recompute and upsert member_summary rows (all members when member_ids is None).
+
+    Write endpoints call this for the members they touched; pending ORM changes
+    are flushed first so the recomputation sees them. The members' rows are
+    locked (in id order) before recomputing, so two transactions refreshing the
+    same member run one after the other and the second one sees the first one's
+    committed changes instead of overwriting the summary with a stale snapshot.
+    """
+    session.flush()
+    query = member_summary_select(datetime.utcnow())
+    lock = select(Member.member_id).order_by(Member.member_id).with_for_update(key_share=True)
+    if member_ids is not None:
+        member_ids = sorted({m for m in member_ids if m is not None})
+        if not member_ids:
+            return 0
+        query = query.where(Member.member_id.in_(member_ids))
+        lock = lock.where(Member.member_id.in_(member_ids))
+    # FOR NO KEY UPDATE: does not block inserts that reference the members
+    session.execute(lock)
+    stmt = pg_insert(MemberSummary).from_select(SUMMARY_COLUMNS, query)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MemberSummary.member_id],
+        set_={col: stmt.excluded[col] for col in SUMMARY_COLUMNS[1:]},
+    )
+    return session.execute(stmt).rowcount
+
+
+def mark_class_members_stale(session, class_id):
+    """Force a lazy summary refresh for everyone registered in a changed class."""
+    session.execute(
+        update(MemberSummary)
+        .where(
+            MemberSummary.member_id.in_(
+                select(ClassRegistration.member_id).where(ClassRegistration.class_id == class_id)
+            )
+        )
+        .values(refresh_after=datetime.utcnow()),
+        execution_options={"synchronize_session": False},
+    )
+
+
 @app.route("/members/<int:member_id>/dashboard", methods=["GET"])
 @require_role("member", "admin")
 def member_dashboard(member_id):
@@ -1339,80 +3214,50 @@ def member_dashboard(member_id):
     if auth["role"] == "member" and auth.get("member_id") != member_id:
         return jsonify({"error": "Forbidden"}), 403
     with get_session() as session:
-        member = session.get(Member, member_id)
-        if not member:
-            return jsonify({"error": "Member not found"}), 404
-
-        last_metric = (
-            session.query(HealthMetric)
-            .filter(HealthMetric.member_id == member_id)
-            .order_by(HealthMetric.recorded_at.desc())
-            .first()
-        )
-        active_goals = (
-            session.query(FitnessGoal).filter(FitnessGoal.member_id == member_id, FitnessGoal.is_active.is_(True)).count()
-        )
-        upcoming_classes = (
-            session.query(GroupClass)
-            .join(ClassRegistration, GroupClass.class_id == ClassRegistration.class_id)
-            .filter(ClassRegistration.member_id == member_id, GroupClass.class_time >= datetime.utcnow())
-            .count()
-        )
-        past_classes = (
-            session.query(ClassRegistration)
-            .join(GroupClass, GroupClass.class_id == ClassRegistration.class_id)
-            .filter(
-                ClassRegistration.member_id == member_id,
-                GroupClass.class_time < datetime.utcnow(),
-                GroupClass.status == "SCHEDULED",
-            )
-            .count()
-        )
-        upcoming_sessions = (
-            session.query(PersonalTrainingSession)
-            .filter(
-                PersonalTrainingSession.member_id == member_id,
-                PersonalTrainingSession.start_time >= datetime.utcnow(),
-                PersonalTrainingSession.status == "SCHEDULED",
-            )
-            .count()
+        lookup = (
+            session.query(Member, MemberSummary)
+            .outerjoin(MemberSummary, MemberSummary.member_id == Member.member_id)
+            .filter(Member.member_id == member_id)
         )
-        past_sessions = (
-            session.query(PersonalTrainingSession)
-            .filter(
-                PersonalTrainingSession.member_id == member_id,
-                PersonalTrainingSession.end_time < datetime.utcnow(),
-                PersonalTrainingSession.status == "SCHEDULED",
-            )
-            .count()
-        )
-
-        # Simple progress: count of completed goals vs active
-        total_goals = session.query(FitnessGoal).filter(FitnessGoal.member_id == member_id).count()
-        active_goals = session.query(FitnessGoal).filter(FitnessGoal.member_id == member_id, FitnessGoal.is_active.is_(True)).count()
-        completed_goals = total_goals - active_goals
+        row = lookup.first()
+        if not row:
+            return jsonify({"error": "Member not found"}), 404
+        member, summary = row
+        # Rows are missing for members created before the projection, and stale once
+        # an upcoming class or session has started; both are repaired on read.
+        if summary is None or (summary.refresh_after and summary.refresh_after <= datetime.utcnow()):
+            refresh_member_summaries(session, [member_id])
+            member, summary = lookup.populate_existing().first()
 
         return jsonify(
             {
                 "member": member_dict(member),
-                "active_goals": active_goals,
-                "completed_goals": completed_goals,
+                "active_goals": summary.active_goals,
+                "completed_goals": summary.total_goals - summary.active_goals,
                 "latest_metric": {
-                    "recorded_at": last_metric.recorded_at.isoformat() if last_metric else None,
-                    "weight": decimal_to_float(last_metric.weight) if last_metric else None,
-                    "heart_rate": last_metric.heart_rate if last_metric else None,
-                    "body_fat": decimal_to_float(last_metric.body_fat) if last_metric else None,
+                    "recorded_at": summary.latest_recorded_at.isoformat(),
+                    "weight": decimal_to_float(summary.latest_weight),
+                    "heart_rate": summary.latest_heart_rate,
+                    "body_fat": decimal_to_float(summary.latest_body_fat),
                 }
-                if last_metric
+                if summary.latest_recorded_at
                 else None,
-                "upcoming_class_count": upcoming_classes,
-                "past_class_count": past_classes,
-                "upcoming_pt_session_count": upcoming_sessions,
-                "past_pt_session_count": past_sessions,
+                "upcoming_class_count": summary.upcoming_class_count,
+                "past_class_count": summary.past_class_count,
+                "upcoming_pt_session_count": summary.upcoming_pt_session_count,
+                "past_pt_session_count": summary.past_pt_session_count,
             }
         )
 
 
+@app.route("/admin/member-summaries/reconcile", methods=["POST"])
+@require_role("admin")
+def admin_reconcile_member_summaries():
+    with get_session() as session:
+        refreshed = refresh_member_summaries(session)
+        return jsonify({"refreshed": refreshed})
+
+
 # ---- Trainer member lookup with context ----
 @app.route("/trainers/<int:trainer_id>/members/search", methods=["GET"])
 @require_role("trainer", "admin")
@@ -1420,72 +3265,94 @@ def trainer_member_lookup(trainer_id):
     auth = g.current_auth
     if auth["role"] == "trainer" and auth.get("trainer_id") != trainer_id:
         return jsonify({"error": "Forbidden"}), 403
-    name = request.args.get("name", "")
-    like_pattern = f"%{name}%"
+    name = request.args.get("name", "").strip()
+    try:
+        limit = min(int(request.args.get("limit", 50)), 200)
+        offset = max(int(request.args.get("offset", 0)), 0)
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
     with get_session() as session:
         # Limit to members that have a PT session or class with this trainer (assigned context)
         member_ids_subq = (
-            session.query(ClassRegistration.member_id.label("member_id"))
+            select(ClassRegistration.member_id)
             .join(GroupClass, GroupClass.class_id == ClassRegistration.class_id)
-            .filter(GroupClass.trainer_id == trainer_id)
-            .union(
-                session.query(PersonalTrainingSession.member_id.label("member_id")).filter(
-                    PersonalTrainingSession.trainer_id == trainer_id
-                )
-            )
-        ).subquery().alias("member_ids_subq")
-        members = (
-            session.query(Member)
-            .filter(
-                Member.member_id.in_(session.query(member_ids_subq.c.member_id)),
-                or_(Member.first_name.ilike(like_pattern), Member.last_name.ilike(like_pattern)),
-            )
-            .all()
+            .where(GroupClass.trainer_id == trainer_id)
+            .union(select(PersonalTrainingSession.member_id).where(PersonalTrainingSession.trainer_id == trainer_id))
         )
-        result = []
-        for m in members:
-            last_metric = (
-                session.query(HealthMetric)
-                .filter(HealthMetric.member_id == m.member_id)
-                .order_by(HealthMetric.recorded_at.desc())
-                .first()
-            )
-            primary_goal = (
-                session.query(FitnessGoal.goal_type)
-                .filter(FitnessGoal.member_id == m.member_id, FitnessGoal.is_active.is_(True))
-                .first()
-            )
-            last_class = (
-                session.query(GroupClass.class_name, GroupClass.class_time)
-                .join(ClassRegistration, ClassRegistration.class_id == GroupClass.class_id)
-                .filter(ClassRegistration.member_id == m.member_id, GroupClass.trainer_id == trainer_id)
-                .order_by(GroupClass.class_time.desc())
-                .first()
+        # Per-member context comes from LATERAL subqueries, so the whole page is one statement
+        last_metric = (
+            select(HealthMetric.weight, HealthMetric.heart_rate, HealthMetric.body_fat, HealthMetric.recorded_at)
+            .where(HealthMetric.member_id == Member.member_id)
+            .order_by(HealthMetric.recorded_at.desc())
+            .limit(1)
+            .lateral("last_metric")
+        )
+        primary_goal = (
+            select(FitnessGoal.goal_type)
+            .where(FitnessGoal.member_id == Member.member_id, FitnessGoal.is_active.is_(True))
+            .order_by(FitnessGoal.goal_id)
+            .limit(1)
+            .lateral("primary_goal")
+        )
+        last_class = (
+            select(GroupClass.class_name, GroupClass.class_time)
+            .join(ClassRegistration, ClassRegistration.class_id == GroupClass.class_id)
+            .where(ClassRegistration.member_id == Member.member_id, GroupClass.trainer_id == trainer_id)
+            .order_by(GroupClass.class_time.desc())
+            .limit(1)
+            .lateral("last_class")
+        )
+        query = (
+            select(
+                Member.member_id,
+                Member.first_name,
+                Member.last_name,
+                Member.email,
+                primary_goal.c.goal_type,
+                last_metric.c.weight,
+                last_metric.c.heart_rate,
+                last_metric.c.body_fat,
+                last_metric.c.recorded_at,
+                last_class.c.class_name,
+                last_class.c.class_time,
             )
-            result.append(
+            .select_from(Member)
+            .outerjoin(primary_goal, true())
+            .outerjoin(last_metric, true())
+            .outerjoin(last_class, true())
+            .where(Member.member_id.in_(member_ids_subq))
+        )
+        if name:
+            query = query.where(member_search_terms(name)[0])
+        rows = session.execute(
+            query.order_by(Member.last_name, Member.first_name, Member.member_id).limit(limit).offset(offset)
+        ).all()
+        return jsonify(
+            [
                 {
-                    "member_id": m.member_id,
-                    "first_name": m.first_name,
-                    "last_name": m.last_name,
-                    "email": m.email,
-                    "primary_goal": primary_goal[0] if primary_goal else None,
+                    "member_id": r.member_id,
+                    "first_name": r.first_name,
+                    "last_name": r.last_name,
+                    "email": r.email,
+                    "primary_goal": r.goal_type,
                     "last_metric": {
-                        "recorded_at": last_metric.recorded_at.isoformat() if last_metric else None,
-                        "weight": decimal_to_float(last_metric.weight) if last_metric else None,
-                        "heart_rate": last_metric.heart_rate if last_metric else None,
-                        "body_fat": decimal_to_float(last_metric.body_fat) if last_metric else None,
+                        "recorded_at": r.recorded_at.isoformat(),
+                        "weight": decimal_to_float(r.weight),
+                        "heart_rate": r.heart_rate,
+                        "body_fat": decimal_to_float(r.body_fat),
                     }
-                    if last_metric
+                    if r.recorded_at
                     else None,
                     "last_class": {
-                        "class_name": last_class.class_name,
-                        "class_time": last_class.class_time.isoformat(),
+                        "class_name": r.class_name,
+                        "class_time": r.class_time.isoformat(),
                     }
-                    if last_class
+                    if r.class_name
                     else None,
                 }
-            )
-        return jsonify(result)
+                for r in rows
+            ]
+        )
 
 
 if __name__ == "__main__":
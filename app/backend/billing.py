@@ -0,0 +1,167 @@
+"""Set-based monthly billing run.
+
+Generates one invoice plus its line items per member of a cohort for a billing
+period, entirely with ``INSERT ... SELECT``. Members are processed in batches,
+each committed on its own; the (member_id, billing_period) unique constraint
+makes a re-run skip members that were already billed, so an interrupted run can
+simply be restarted:
+
+    python billing.py 2025-11 --plan plans/standard.json [--member-id 1 --member-id 2]
+
+The plan file is a JSON list of ``{"description", "quantity", "unit_price"}`` items.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from db import bump_change_version, engine
+
+BILLING_BATCH = 5000
+CENT = Decimal("0.01")
+# Largest amount invoices.total_amount (numeric(8, 2)) can hold
+MAX_INVOICE_TOTAL = Decimal("999999.99")
+MAX_QUANTITY = 2**31 - 1
+
+INSERT_INVOICES_SQL = """
+INSERT INTO invoices (member_id, issue_date, due_date, total_amount, amount_paid, status, notes, billing_period)
+SELECT member_id, :issue_date, :due_date, :total, 0, 'UNPAID', :notes, :period
+FROM members
+WHERE member_id = ANY(:member_ids)
+ON CONFLICT (member_id, billing_period) DO NOTHING
+RETURNING invoice_id
+"""
+
+INSERT_ITEMS_SQL = """
+INSERT INTO invoice_items (invoice_id, description, quantity, unit_price)
+SELECT i.invoice_id, plan.description, plan.quantity, plan.unit_price
+FROM unnest(CAST(:invoice_ids AS integer[])) AS i(invoice_id)
+CROSS JOIN unnest(
+    CAST(:descriptions AS text[]), CAST(:quantities AS integer[]), CAST(:prices AS numeric[])
+) AS plan(description, quantity, unit_price)
+"""
+
+
+def parse_period(value):
+    """Return the first day of a "YYYY-MM" billing period."""
+    try:
+        year, month = (int(part) for part in value.split("-"))
+        return date(year, month, 1)
+    except (AttributeError, ValueError):
+        raise ValueError("period must look like YYYY-MM")
+
+
+def parse_plan(items):
+    """Validate plan items and return (items, total).
+
+    Prices are rounded to cents, and the invoice total has to fit the
+    ``numeric(8, 2)`` amount columns.
+    """
+    if not items:
+        raise ValueError("At least one plan item required")
+    if not isinstance(items, list):
+        raise ValueError("Plan items must be a list")
+    parsed = []
+    total = Decimal("0")
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError("Each plan item must be an object")
+        try:
+            quantity = int(item.get("quantity", 1))
+            unit_price = Decimal(str(item["unit_price"]))
+        except (KeyError, TypeError, ValueError, InvalidOperation):
+            raise ValueError("Each plan item needs a numeric unit_price and integer quantity")
+        if not unit_price.is_finite():
+            raise ValueError("unit_price must be a finite number")
+        unit_price = unit_price.quantize(CENT, rounding=ROUND_HALF_UP)
+        if quantity < 1 or unit_price < 0:
+            raise ValueError("quantity must be positive and unit_price non-negative")
+        if quantity > MAX_QUANTITY:
+            raise ValueError(f"quantity cannot exceed {MAX_QUANTITY}")
+        parsed.append({"description": item.get("description"), "quantity": quantity, "unit_price": unit_price})
+        total += unit_price * quantity
+        if total > MAX_INVOICE_TOTAL:
+            raise ValueError(f"Plan total cannot exceed {MAX_INVOICE_TOTAL}")
+    return parsed, total
+
+
+def run_billing(period, items, member_ids=None, due_days=14, notes=None, batch_size=BILLING_BATCH):
+    """Invoice every member in the cohort (all members when ``member_ids`` is None).
+
+    Returns counts and throughput; members already invoiced for the period are
+    reported as skipped.
+    """
+    issue_date = parse_period(period)
+    plan, total = parse_plan(items)
+    began = time.perf_counter()
+    with engine.connect() as conn:
+        if member_ids is None:
+            cohort = conn.execute(text("SELECT member_id FROM members ORDER BY member_id")).scalars().all()
+        else:
+            cohort = sorted(set(member_ids))
+
+    params = {
+        "period": issue_date.strftime("%Y-%m"),
+        "issue_date": issue_date,
+        "due_date": issue_date + timedelta(days=due_days),
+        "total": total,
+        "notes": notes or f"Membership {issue_date:%B %Y}",
+        "descriptions": [p["description"] for p in plan],
+        "quantities": [p["quantity"] for p in plan],
+        "prices": [p["unit_price"] for p in plan],
+    }
+    invoices = 0
+    line_items = 0
+    for start in range(0, len(cohort), batch_size):
+        batch = cohort[start : start + batch_size]
+        with engine.begin() as conn:
+            invoice_ids = conn.execute(text(INSERT_INVOICES_SQL), {**params, "member_ids": batch}).scalars().all()
+            if invoice_ids:
+                result = conn.execute(text(INSERT_ITEMS_SQL), {**params, "invoice_ids": invoice_ids})
+                line_items += result.rowcount
+                bump_change_version(conn, "invoices")
+        invoices += len(invoice_ids)
+
+    seconds = time.perf_counter() - began
+    rows = invoices + line_items
+    return {
+        "period": params["period"],
+        "members": len(cohort),
+        "invoices_created": invoices,
+        "items_created": line_items,
+        "skipped": len(cohort) - invoices,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows / seconds) if seconds else None,
+    }
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Generate invoices for a billing period")
+    parser.add_argument("period", help="billing period as YYYY-MM")
+    parser.add_argument("--plan", required=True, help="JSON file with the plan's line items")
+    parser.add_argument("--member-id", dest="member_ids", type=int, action="append")
+    parser.add_argument("--due-days", type=int, default=14)
+    parser.add_argument("--notes")
+    args = parser.parse_args()
+    with open(args.plan) as fh:
+        items = json.load(fh)
+    report = run_billing(args.period, items, args.member_ids, args.due_days, args.notes)
+    print(
+        f"{report['period']}: {report['invoices_created']} invoices, {report['items_created']} items, "
+        f"{report['skipped']} skipped in {report['seconds']}s ({report['rows_per_second']} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
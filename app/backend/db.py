@@ -1,8 +1,9 @@
 import os
 from contextlib import contextmanager
+from contextvars import ContextVar
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
@@ -17,19 +18,46 @@ DB_CONFIG = {
     "port": int(os.getenv("DB_PORT", "5432")),
 }
 
-# SQLAlchemy engine/session (ORM path)
-DATABASE_URL = (
+# SQLAlchemy engine/session (ORM path); DATABASE_URL overrides the DB_* settings
+DATABASE_URL = os.getenv("DATABASE_URL") or (
     f"postgresql+psycopg2://{DB_CONFIG['user']}:{DB_CONFIG['password']}"
     f"@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
 )
 engine = create_engine(DATABASE_URL, future=True)
 SessionLocal = sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
 
+BUMP_CHANGE_VERSION_SQL = text("""
+INSERT INTO change_versions (name, version) VALUES (:name, 1)
+ON CONFLICT (name) DO UPDATE SET version = change_versions.version + 1
+RETURNING version
+""")
+
+# Connection whose open transaction get_session joins instead of starting its own
+_bound_connection = ContextVar("bound_connection", default=None)
+
+
+@contextmanager
+def bind_sessions(conn):
+    """Run get_session blocks inside ``conn``'s transaction for the duration.
+
+    Their commits and rollbacks apply to a savepoint; the caller decides whether
+    the outer transaction commits.
+    """
+    token = _bound_connection.set(conn)
+    try:
+        yield conn
+    finally:
+        _bound_connection.reset(token)
+
 
 @contextmanager
 def get_session():
     """Provide a transactional scope around a series of operations."""
-    session = SessionLocal()
+    conn = _bound_connection.get()
+    if conn is None:
+        session = SessionLocal()
+    else:
+        session = SessionLocal(bind=conn, join_transaction_mode="create_savepoint")
     try:
         yield session
         session.commit()
@@ -40,6 +68,15 @@ def get_session():
         session.close()
 
 
+def bump_change_version(conn, name):
+    """Increment and return the change version for ``name`` in the current transaction.
+
+    ``conn`` may be a Connection or a Session. Processes holding a cache derived
+    from ``name`` compare the version to notice writes made anywhere else.
+    """
+    return conn.execute(BUMP_CHANGE_VERSION_SQL, {"name": name}).scalar_one()
+
+
 def get_conn():
     """Raw psycopg2 connection (legacy)."""
     return psycopg2.connect(**DB_CONFIG)
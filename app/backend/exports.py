@@ -0,0 +1,141 @@
+"""COPY-based bulk exports of analytics tables.
+
+Rows go straight from Postgres' ``COPY ... TO STDOUT`` to a file or an HTTP
+response without building ORM objects. Usable from the API or the command line:
+
+    python exports.py payments --from 2025-01-01 --to 2025-02-01 --out payments.csv
+"""
+import argparse
+import queue
+import threading
+from datetime import datetime
+
+from db import get_conn
+
+# Exportable tables and the timestamp column used for date-range filters
+EXPORT_TABLES = {
+    "health_metrics": "recorded_at",
+    "class_registrations": "registered_at",
+    "payments": "payment_date",
+}
+EXPORT_FORMATS = {
+    "csv": "FORMAT csv, HEADER true",
+    # Postgres' native binary COPY format; load with COPY ... FROM ... (FORMAT binary)
+    "binary": "FORMAT binary",
+}
+
+
+def validate_export(table, fmt):
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown export table {table}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt}")
+
+
+def build_copy_sql(cur, table, fmt="csv", start=None, end=None):
+    """Return the COPY statement for a table export with an optional [start, end) range."""
+    validate_export(table, fmt)
+    column = EXPORT_TABLES[table]
+    conditions = []
+    params = []
+    if start:
+        conditions.append(f"{column} >= %s")
+        params.append(start)
+    if end:
+        conditions.append(f"{column} < %s")
+        params.append(end)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    # COPY cannot take bind parameters, so the values are escaped client-side
+    select_sql = cur.mogrify(f"SELECT * FROM {table}{where}", params).decode()
+    return f"COPY ({select_sql}) TO STDOUT WITH ({EXPORT_FORMATS[fmt]})"
+
+
+def copy_export(table, out, fmt="csv", start=None, end=None):
+    """Write a table export into a writable file object."""
+    conn = get_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.copy_expert(build_copy_sql(cur, table, fmt, start, end), out)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class _QueueWriter:
+    """File-like sink that hands COPY output chunks to a bounded queue."""
+
+    def __init__(self, chunks, cancelled):
+        self.chunks = chunks
+        self.cancelled = cancelled
+
+    def write(self, data):
+        chunk = data.encode() if isinstance(data, str) else bytes(data)
+        while True:
+            if self.cancelled.is_set():
+                # Raising from write() aborts the COPY and frees the connection
+                raise IOError("Export cancelled by client")
+            try:
+                self.chunks.put(chunk, timeout=1)
+                return len(data)
+            except queue.Full:
+                continue
+
+
+def stream_export(table, fmt="csv", start=None, end=None, max_chunks=64):
+    """Return an iterator over export chunks as COPY produces them.
+
+    COPY runs in a worker thread; the bounded queue applies backpressure so memory
+    stays flat no matter how large the table is. Validation errors are raised
+    before the first chunk is yielded.
+    """
+    validate_export(table, fmt)
+    chunks = queue.Queue(maxsize=max_chunks)
+    cancelled = threading.Event()
+    done = object()
+    failure = []
+
+    def run():
+        try:
+            copy_export(table, _QueueWriter(chunks, cancelled), fmt, start, end)
+        except Exception as exc:
+            failure.append(exc)
+        finally:
+            while not cancelled.is_set():
+                try:
+                    chunks.put(done, timeout=1)
+                    break
+                except queue.Full:
+                    continue
+
+    def generate():
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is done:
+                    break
+                yield chunk
+            if failure:
+                raise failure[0]
+        finally:
+            # Also runs when the client disconnects and the generator is closed early
+            cancelled.set()
+
+    threading.Thread(target=run, daemon=True).start()
+    return generate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a table with COPY")
+    parser.add_argument("table", choices=sorted(EXPORT_TABLES))
+    parser.add_argument("--format", dest="fmt", choices=sorted(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--from", dest="start", type=datetime.fromisoformat)
+    parser.add_argument("--to", dest="end", type=datetime.fromisoformat)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+    with open(args.out, "wb") as out:
+        copy_export(args.table, out, args.fmt, args.start, args.end)
+    print(f"Exported {args.table} to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
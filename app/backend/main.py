@@ -1,7 +1,9 @@
 import os
 from dotenv import load_dotenv
 
-from app import app
+from app import app, warm_member_typeahead
+from db import engine
+from metrics_maintenance import ensure_partitions
 
 
 def main():
@@ -9,6 +11,10 @@ def main():
     host = os.getenv("FLASK_HOST", "0.0.0.0")
     port = int(os.getenv("FLASK_PORT", "5000"))
     debug = os.getenv("FLASK_DEBUG", "true").lower() == "true"
+    # health_metrics inserts fail until the current month's partition exists
+    with engine.begin() as conn:
+        ensure_partitions(conn)
+    warm_member_typeahead()
     app.run(host=host, port=port, debug=debug)
 
 
@@ -0,0 +1,56 @@
+"""Incremental open-issue and time-to-repair counters for equipment and rooms.
+
+The API adjusts maintenance_stats as logs are opened, resolved or reopened, so
+reading the numbers never scans maintenance history. rebuild_maintenance_stats
+recomputes them from scratch (seeding, or after manual edits to the logs).
+"""
+from sqlalchemy import text
+
+MAINTENANCE_RESOLVED = "RESOLVED"
+MAINTENANCE_STATUSES = ("OPEN", "IN_PROGRESS", MAINTENANCE_RESOLVED)
+
+ADJUST_STATS_SQL = """
+INSERT INTO maintenance_stats (scope, scope_id, open_count, resolved_count, repair_seconds)
+VALUES (:scope, :scope_id, :open_delta, :resolved_delta, :seconds_delta)
+ON CONFLICT (scope, scope_id) DO UPDATE SET
+    open_count = maintenance_stats.open_count + EXCLUDED.open_count,
+    resolved_count = maintenance_stats.resolved_count + EXCLUDED.resolved_count,
+    repair_seconds = maintenance_stats.repair_seconds + EXCLUDED.repair_seconds
+"""
+
+_REBUILD_SELECT = """
+SELECT '{scope}', {scope_id},
+       count(*) FILTER (WHERE l.status <> 'RESOLVED'),
+       count(*) FILTER (WHERE l.status = 'RESOLVED' AND l.resolved_timestamp IS NOT NULL),
+       coalesce(sum(extract(epoch FROM l.resolved_timestamp - l.created_at)::bigint)
+                FILTER (WHERE l.status = 'RESOLVED' AND l.resolved_timestamp IS NOT NULL), 0)
+FROM maintenance_logs l
+JOIN equipment e ON e.equipment_id = l.equipment_id
+WHERE {scope_id} IS NOT NULL
+GROUP BY {scope_id}
+"""
+
+REBUILD_STATS_SQL = (
+    "INSERT INTO maintenance_stats (scope, scope_id, open_count, resolved_count, repair_seconds)"
+    + _REBUILD_SELECT.format(scope="equipment", scope_id="e.equipment_id")
+    + "UNION ALL"
+    + _REBUILD_SELECT.format(scope="room", scope_id="e.room_id")
+)
+
+
+def adjust_maintenance_stats(conn, equipment_id, room_id, open_delta=0, resolved_delta=0, seconds_delta=0):
+    """Apply one log transition to the equipment's and its room's counters.
+
+    ``conn`` is a Session or Connection; the change commits with the caller's transaction.
+    """
+    deltas = {"open_delta": open_delta, "resolved_delta": resolved_delta, "seconds_delta": int(seconds_delta)}
+    rows = [{"scope": "equipment", "scope_id": equipment_id, **deltas}]
+    if room_id is not None:
+        rows.append({"scope": "room", "scope_id": room_id, **deltas})
+    conn.execute(text(ADJUST_STATS_SQL), rows)
+
+
+def rebuild_maintenance_stats(conn):
+    """Recompute every counter from maintenance_logs; returns the number of rows written."""
+    conn.execute(text("DELETE FROM maintenance_stats"))
+    return conn.execute(text(REBUILD_STATS_SQL)).rowcount
@@ -0,0 +1,185 @@
+"""Partition upkeep for the monthly range-partitioned health_metrics table.
+
+Run nightly (``python metrics_maintenance.py``) to:
+- create upcoming monthly partitions ahead of time,
+- roll readings older than the retention window into health_metric_daily,
+- drop those raw partitions once they are rolled up.
+"""
+import os
+import sys
+from datetime import date
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from db import engine
+
+PARENT_TABLE = "health_metrics"
+DEFAULT_PARTITION = "health_metrics_default"
+PARTITIONS_AHEAD = int(os.getenv("HEALTH_METRIC_PARTITIONS_AHEAD", "3"))
+
+
+def month_start(day, offset=0):
+    """First day of the month ``offset`` months away from ``day``."""
+    index = day.year * 12 + day.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{PARENT_TABLE}_p{month.year:04d}_{month.month:02d}"
+
+
+def ensure_partitions(conn, start=None, months_ahead=PARTITIONS_AHEAD):
+    """Create monthly partitions from ``start`` through ``months_ahead`` months from now.
+
+    Readings for a month without a partition land in the default partition, and
+    Postgres refuses to create the month's partition while they sit there. For such
+    a month the default is detached, the partition created, the rows moved into it
+    and the default reattached, all within the caller's transaction.
+    """
+    # Catch-all for readings far outside the maintained range
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+    month = month_start(start or date.today())
+    last = month_start(date.today(), months_ahead)
+    created = []
+    while month <= last:
+        name = partition_name(month)
+        exists = conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+        if not exists:
+            bounds = {"lower": month, "upper": month_start(month, 1)}
+            stranded = conn.execute(
+                text(
+                    f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+                    "WHERE recorded_at >= :lower AND recorded_at < :upper)"
+                ),
+                bounds,
+            ).scalar()
+            if stranded:
+                conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+            conn.execute(
+                text(
+                    f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{bounds['upper'].isoformat()}')"
+                )
+            )
+            if stranded:
+                conn.execute(
+                    text(
+                        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                        "WHERE recorded_at >= :lower AND recorded_at < :upper RETURNING *) "
+                        f"INSERT INTO {name} SELECT * FROM moved"
+                    ),
+                    bounds,
+                )
+                conn.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+            created.append(name)
+        month = month_start(month, 1)
+    return created
+
+
+def list_partitions(conn):
+    """Return (name, month) for every monthly partition, oldest first."""
+    names = conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :parent"
+        ),
+        {"parent": PARENT_TABLE},
+    ).scalars()
+    partitions = []
+    for name in names:
+        if name == DEFAULT_PARTITION:
+            continue
+        year, month = name.rsplit("_p", 1)[1].split("_")
+        partitions.append((name, date(int(year), int(month), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+# Late readings (e.g. from the default partition) merge into days already rolled up:
+# counts add, each average is weighted by that metric's own reading count and
+# extremes widen
+ROLLUP_SQL = """
+INSERT INTO health_metric_daily AS d (
+    member_id, day, readings,
+    weight_readings, weight_avg, weight_min, weight_max,
+    heart_rate_readings, heart_rate_avg, heart_rate_min, heart_rate_max,
+    body_fat_readings, body_fat_avg, body_fat_min, body_fat_max
+)
+SELECT
+    member_id, recorded_at::date, count(*),
+    count(weight), avg(weight), min(weight), max(weight),
+    count(heart_rate), avg(heart_rate), min(heart_rate), max(heart_rate),
+    count(body_fat), avg(body_fat), min(body_fat), max(body_fat)
+FROM {source}
+WHERE {condition}
+GROUP BY member_id, recorded_at::date
+ON CONFLICT (member_id, day) DO UPDATE SET
+    readings = d.readings + EXCLUDED.readings,
+    weight_readings = d.weight_readings + EXCLUDED.weight_readings,
+    weight_avg = (
+        coalesce(d.weight_avg * d.weight_readings, 0)
+        + coalesce(EXCLUDED.weight_avg * EXCLUDED.weight_readings, 0)
+    ) / nullif(d.weight_readings + EXCLUDED.weight_readings, 0),
+    weight_min = least(d.weight_min, EXCLUDED.weight_min),
+    weight_max = greatest(d.weight_max, EXCLUDED.weight_max),
+    heart_rate_readings = d.heart_rate_readings + EXCLUDED.heart_rate_readings,
+    heart_rate_avg = (
+        coalesce(d.heart_rate_avg * d.heart_rate_readings, 0)
+        + coalesce(EXCLUDED.heart_rate_avg * EXCLUDED.heart_rate_readings, 0)
+    ) / nullif(d.heart_rate_readings + EXCLUDED.heart_rate_readings, 0),
+    heart_rate_min = least(d.heart_rate_min, EXCLUDED.heart_rate_min),
+    heart_rate_max = greatest(d.heart_rate_max, EXCLUDED.heart_rate_max),
+    body_fat_readings = d.body_fat_readings + EXCLUDED.body_fat_readings,
+    body_fat_avg = (
+        coalesce(d.body_fat_avg * d.body_fat_readings, 0)
+        + coalesce(EXCLUDED.body_fat_avg * EXCLUDED.body_fat_readings, 0)
+    ) / nullif(d.body_fat_readings + EXCLUDED.body_fat_readings, 0),
+    body_fat_min = least(d.body_fat_min, EXCLUDED.body_fat_min),
+    body_fat_max = greatest(d.body_fat_max, EXCLUDED.body_fat_max)
+"""
+
+
+def rollup_expired(retention_months):
+    """Roll up and drop raw partitions entirely older than the retention window.
+
+    Each partition is rolled up, detached and dropped in one transaction, so a
+    failed run leaves nothing half-counted and is safe to retry. Rollups merge
+    into existing daily rows rather than replacing them.
+    """
+    cutoff = month_start(date.today(), -retention_months)
+    dropped = []
+    with engine.connect() as conn:
+        partitions = list_partitions(conn)
+    for name, month in partitions:
+        if month_start(month, 1) > cutoff:
+            break
+        with engine.begin() as conn:
+            conn.execute(text(ROLLUP_SQL.format(source=name, condition="true")))
+            conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            conn.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    with engine.begin() as conn:
+        params = {"cutoff": cutoff}
+        conn.execute(text(ROLLUP_SQL.format(source=DEFAULT_PARTITION, condition="recorded_at < :cutoff")), params)
+        conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE recorded_at < :cutoff"), params)
+    return dropped
+
+
+def main():
+    load_dotenv()
+    retention_months = int(os.getenv("HEALTH_METRIC_RETENTION_MONTHS", "24"))
+    with engine.begin() as conn:
+        created = ensure_partitions(conn)
+    print(f"Created partitions: {', '.join(created) or 'none'}")
+    dropped = rollup_expired(retention_months)
+    print(f"Rolled up and dropped partitions: {', '.join(dropped) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""Streaming bank/card settlement reconciliation.
+
+Settlement CSVs have a header row with ``reference``, ``amount`` and ``date``
+columns, plus optional ``invoice_id`` and ``payment_method``. Rows are read
+lazily and handled in batches; each batch is matched against existing payments
+by reference with one lookup, missing payments are bulk-inserted and their
+invoices updated in one statement, and the batch is committed. Memory stays flat
+regardless of file size, and re-importing a file matches the rows already
+posted instead of duplicating them. payments.reference is unique, so imports
+running concurrently cannot post the same reference twice either:
+
+    python reconciliation.py settlements.csv --report mismatches.csv
+"""
+import argparse
+import csv
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from db import bump_change_version, engine
+from revenue import record_payment_revenue
+
+RECONCILE_BATCH = 5000
+# Settlement dates may trail the recorded payment by a few days
+RECONCILE_DATE_TOLERANCE_DAYS = int(os.getenv("RECONCILE_DATE_TOLERANCE_DAYS", "3"))
+# Mismatches returned inline; the full list goes to the report file
+RECONCILE_SAMPLE = 100
+REPORT_FIELDS = ["line", "reference", "amount", "date", "invoice_id", "reason", "detail"]
+
+EXISTING_PAYMENTS_SQL = """
+SELECT reference, amount, payment_date
+FROM payments
+WHERE reference = ANY(:references)
+"""
+
+LOCK_INVOICES_SQL = """
+SELECT invoice_id, total_amount, amount_paid
+FROM invoices
+WHERE invoice_id = ANY(:invoice_ids)
+ORDER BY invoice_id
+FOR UPDATE
+"""
+
+INSERT_PAYMENTS_SQL = """
+INSERT INTO payments (invoice_id, amount, payment_method, status, payment_date, reference)
+SELECT v.invoice_id, v.amount, v.payment_method, 'SUCCESS', v.payment_date, v.reference
+FROM unnest(
+    CAST(:invoice_ids AS integer[]), CAST(:amounts AS numeric[]), CAST(:methods AS text[]),
+    CAST(:dates AS timestamp[]), CAST(:references AS text[])
+) AS v(invoice_id, amount, payment_method, payment_date, reference)
+ON CONFLICT (reference) DO NOTHING
+RETURNING payment_id, reference
+"""
+
+UPDATE_INVOICES_SQL = """
+UPDATE invoices i SET
+    amount_paid = i.amount_paid + v.amount,
+    status = CASE WHEN i.amount_paid + v.amount = i.total_amount THEN 'PAID' ELSE 'PARTIAL' END
+FROM unnest(CAST(:invoice_ids AS integer[]), CAST(:amounts AS numeric[])) AS v(invoice_id, amount)
+WHERE i.invoice_id = v.invoice_id
+"""
+
+
+def parse_settlement(line_no, raw):
+    """Return a settlement dict from a CSV row; raises ValueError with the reason."""
+    reference = (raw.get("reference") or "").strip()
+    if not reference:
+        raise ValueError("missing reference")
+    try:
+        amount = Decimal(raw.get("amount") or "")
+    except InvalidOperation:
+        raise ValueError("amount must be numeric")
+    if not amount.is_finite():
+        raise ValueError("amount must be a finite number")
+    if amount <= 0:
+        raise ValueError("amount must be positive")
+    if amount.normalize().as_tuple().exponent < -2:
+        raise ValueError("amount must have at most 2 decimal places")
+    paid_at = datetime.fromisoformat((raw.get("date") or "").strip())
+    if paid_at.tzinfo:
+        # payments.payment_date is naive UTC
+        paid_at = paid_at.astimezone(timezone.utc).replace(tzinfo=None)
+    invoice_id = (raw.get("invoice_id") or "").strip()
+    return {
+        "line": line_no,
+        "reference": reference,
+        "amount": amount,
+        "date": paid_at,
+        "invoice_id": int(invoice_id) if invoice_id else None,
+        "payment_method": (raw.get("payment_method") or "").strip() or "BANK_TRANSFER",
+    }
+
+
+class _Report:
+    """Counts outcomes, keeps a small sample and streams every mismatch to ``out``."""
+
+    def __init__(self, out=None):
+        self.writer = csv.DictWriter(out, fieldnames=REPORT_FIELDS) if out else None
+        if self.writer:
+            self.writer.writeheader()
+        self.counts = defaultdict(int)
+        self.sample = []
+
+    def mismatch(self, row, reason, detail=""):
+        self.counts["mismatched"] += 1
+        entry = {
+            "line": row["line"],
+            "reference": row.get("reference"),
+            "amount": str(row.get("amount", "")),
+            "date": row["date"].isoformat() if isinstance(row.get("date"), datetime) else row.get("date"),
+            "invoice_id": row.get("invoice_id"),
+            "reason": reason,
+            "detail": detail,
+        }
+        if self.writer:
+            self.writer.writerow(entry)
+        if len(self.sample) < RECONCILE_SAMPLE:
+            self.sample.append(entry)
+
+
+def _match(row, payment, report):
+    """Compare a settlement row with the payment already recorded under its reference."""
+    if payment.amount != row["amount"]:
+        report.mismatch(row, "amount_differs", f"recorded {payment.amount}")
+    elif payment.payment_date and abs((payment.payment_date - row["date"]).days) > RECONCILE_DATE_TOLERANCE_DAYS:
+        report.mismatch(row, "date_differs", f"recorded {payment.payment_date.isoformat()}")
+    else:
+        report.counts["matched"] += 1
+
+
+def _reconcile_batch(batch, report):
+    # Repeated references inside a batch are reported; across batches the second
+    # occurrence matches the payment the first one created
+    unique = {}
+    for row in batch:
+        if row["reference"] in unique:
+            report.mismatch(row, "duplicate_reference", f"first seen on line {unique[row['reference']]['line']}")
+        else:
+            unique[row["reference"]] = row
+
+    with engine.begin() as conn:
+        existing = {
+            r.reference: r
+            for r in conn.execute(text(EXISTING_PAYMENTS_SQL), {"references": list(unique)})
+        }
+        to_post = []
+        for row in unique.values():
+            payment = existing.get(row["reference"])
+            if payment is None:
+                to_post.append(row)
+            else:
+                _match(row, payment, report)
+
+        invoice_ids = sorted({row["invoice_id"] for row in to_post if row["invoice_id"] is not None})
+        invoices = {
+            r.invoice_id: r for r in conn.execute(text(LOCK_INVOICES_SQL), {"invoice_ids": invoice_ids})
+        }
+        posting = []
+        applied = defaultdict(Decimal)
+        for row in to_post:
+            invoice = invoices.get(row["invoice_id"])
+            if row["invoice_id"] is None:
+                report.mismatch(row, "unmatched_payment", "no payment with this reference and no invoice_id")
+            elif invoice is None:
+                report.mismatch(row, "unknown_invoice")
+            elif invoice.amount_paid + applied[invoice.invoice_id] + row["amount"] > invoice.total_amount:
+                balance = invoice.total_amount - invoice.amount_paid - applied[invoice.invoice_id]
+                report.mismatch(row, "overpays_invoice", f"balance {balance}")
+            else:
+                applied[invoice.invoice_id] += row["amount"]
+                posting.append(row)
+
+        if posting:
+            inserted = conn.execute(
+                text(INSERT_PAYMENTS_SQL),
+                {
+                    "invoice_ids": [row["invoice_id"] for row in posting],
+                    "amounts": [row["amount"] for row in posting],
+                    "methods": [row["payment_method"] for row in posting],
+                    "dates": [row["date"] for row in posting],
+                    "references": [row["reference"] for row in posting],
+                },
+            ).all()
+            if len(inserted) < len(posting):
+                # A concurrent import posted some references first; match against theirs
+                posted_refs = {r.reference for r in inserted}
+                raced = [row for row in posting if row["reference"] not in posted_refs]
+                posting = [row for row in posting if row["reference"] in posted_refs]
+                existing = {
+                    r.reference: r
+                    for r in conn.execute(
+                        text(EXISTING_PAYMENTS_SQL), {"references": [row["reference"] for row in raced]}
+                    )
+                }
+                for row in raced:
+                    _match(row, existing[row["reference"]], report)
+                applied = defaultdict(Decimal)
+                for row in posting:
+                    applied[row["invoice_id"]] += row["amount"]
+            if applied:
+                conn.execute(
+                    text(UPDATE_INVOICES_SQL),
+                    {"invoice_ids": list(applied), "amounts": list(applied.values())},
+                )
+                record_payment_revenue(conn, [r.payment_id for r in inserted])
+                bump_change_version(conn, "invoices")
+            report.counts["posted"] += len(posting)
+            report.counts["invoices_updated"] += len(applied)
+
+
+def reconcile_settlements(lines, report_out=None, batch_size=RECONCILE_BATCH):
+    """Reconcile an iterable of CSV text lines; returns a summary with a mismatch sample.
+
+    Every mismatch is also written as CSV to ``report_out`` when given.
+    """
+    reader = csv.DictReader(lines)
+    missing = {"reference", "amount", "date"} - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(sorted(missing))}")
+    report = _Report(report_out)
+    batch = []
+    for raw in reader:
+        report.counts["rows"] += 1
+        try:
+            batch.append(parse_settlement(reader.line_num, raw))
+        except ValueError as exc:
+            report.mismatch({"line": reader.line_num, **raw}, "invalid_row", str(exc))
+        if len(batch) >= batch_size:
+            _reconcile_batch(batch, report)
+            batch = []
+    if batch:
+        _reconcile_batch(batch, report)
+    summary = {name: report.counts[name] for name in ("rows", "matched", "posted", "invoices_updated", "mismatched")}
+    return {**summary, "mismatches": report.sample}
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Reconcile a settlement CSV against payments")
+    parser.add_argument("path")
+    parser.add_argument("--report", help="write every mismatch to this CSV file")
+    args = parser.parse_args()
+    with open(args.path, newline="") as lines:
+        if args.report:
+            with open(args.report, "w", newline="") as out:
+                summary = reconcile_settlements(lines, out)
+        else:
+            summary = reconcile_settlements(lines)
+    print(
+        f"{summary['rows']} rows: {summary['matched']} matched, {summary['posted']} posted, "
+        f"{summary['invoices_updated']} invoices updated, {summary['mismatched']} mismatched"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Daily revenue rollups by payment method, line item and member cohort.
+
+Payments are folded into revenue_daily as they post (record_payment_revenue).
+backfill_revenue rebuilds a date range from the raw payments, for history that
+predates the rollup or after manual corrections:
+
+    python revenue.py --from 2025-01-01 --to 2025-12-01
+"""
+import argparse
+import os
+import sys
+from datetime import date
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from db import engine
+
+REVENUE_DIMENSIONS = ("payment_method", "item", "cohort")
+
+_UPSERT = """
+INSERT INTO revenue_daily (dimension, day, key, amount, payments)
+{select}
+ON CONFLICT (dimension, day, key) DO UPDATE SET
+    amount = revenue_daily.amount + EXCLUDED.amount,
+    payments = revenue_daily.payments + EXCLUDED.payments
+"""
+
+ROLLUP_SQL = {
+    "payment_method": _UPSERT.format(
+        select="""
+SELECT 'payment_method', p.payment_date::date, coalesce(p.payment_method, 'UNKNOWN'), sum(p.amount), count(*)
+FROM payments p
+WHERE p.status = 'SUCCESS' AND {condition}
+GROUP BY 2, 3"""
+    ),
+    # Each payment is split across its invoice's line items in proportion to their value
+    "item": _UPSERT.format(
+        select="""
+SELECT 'item', p.payment_date::date, coalesce(it.description, 'Unspecified'),
+       coalesce(sum(round(p.amount * it.quantity * it.unit_price / nullif(i.total_amount, 0), 2)), 0),
+       count(DISTINCT p.payment_id)
+FROM payments p
+JOIN invoices i ON i.invoice_id = p.invoice_id
+JOIN invoice_items it ON it.invoice_id = i.invoice_id
+WHERE p.status = 'SUCCESS' AND {condition}
+GROUP BY 2, 3"""
+    ),
+    # Cohort is the month of the member's first invoice
+    "cohort": _UPSERT.format(
+        select="""
+SELECT 'cohort', p.payment_date::date, coalesce(to_char(first_invoice.issue_date, 'YYYY-MM'), 'UNKNOWN'),
+       sum(p.amount), count(*)
+FROM payments p
+LEFT JOIN invoices i ON i.invoice_id = p.invoice_id
+LEFT JOIN LATERAL (
+    SELECT min(fi.issue_date) AS issue_date FROM invoices fi WHERE fi.member_id = i.member_id
+) first_invoice ON true
+WHERE p.status = 'SUCCESS' AND {condition}
+GROUP BY 2, 3"""
+    ),
+}
+
+
+def record_payment_revenue(conn, payment_ids):
+    """Add freshly posted payments to the rollup inside the caller's transaction.
+
+    ``conn`` is a Session or Connection; the payments must already be flushed.
+    """
+    params = {"payment_ids": list(payment_ids)}
+    for dimension in REVENUE_DIMENSIONS:
+        conn.execute(
+            text(ROLLUP_SQL[dimension].format(condition="p.payment_id = ANY(:payment_ids)")),
+            params,
+        )
+
+
+def backfill_revenue(start=None, end=None):
+    """Recompute revenue_daily for days in [start, end) (the whole history by default)."""
+    conditions = ["true"]
+    payment_conditions = ["true"]
+    params = {}
+    if start:
+        conditions.append("day >= :start")
+        payment_conditions.append("p.payment_date >= :start")
+        params["start"] = start
+    if end:
+        conditions.append("day < :end")
+        payment_conditions.append("p.payment_date < :end")
+        params["end"] = end
+    where = " AND ".join(conditions)
+    with engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM revenue_daily WHERE {where}"), params)
+        condition = " AND ".join(payment_conditions)
+        for dimension in REVENUE_DIMENSIONS:
+            conn.execute(text(ROLLUP_SQL[dimension].format(condition=condition)), params)
+        return conn.execute(text(f"SELECT count(*) FROM revenue_daily WHERE {where}"), params).scalar()
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Rebuild daily revenue rollups")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat)
+    parser.add_argument("--to", dest="end", type=date.fromisoformat)
+    args = parser.parse_args()
+    rows = backfill_revenue(args.start, args.end)
+    print(f"Rebuilt {rows} revenue_daily rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""Room/trainer assignment engine for batches of group class requests.
+
+The engine works on plain dicts/tuples so it can be driven from the API (with
+rows loaded from the database) or from the synthetic benchmark at the bottom of
+this file. Time is discretized onto a grid of ``step_minutes`` cells so that
+conflict checks are simple set lookups.
+"""
+import bisect
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+CLASS_DURATION = timedelta(hours=1)
+
+
+class _Schedule:
+    """Occupancy of rooms and trainers on the time grid."""
+
+    def __init__(self, epoch, step_minutes):
+        self.epoch = epoch
+        self.step = timedelta(minutes=step_minutes)
+        self.class_cells = math.ceil(CLASS_DURATION / self.step)
+        self.room_busy = {}
+        self.trainer_busy = {}
+
+    def cell(self, moment, round_up=False):
+        offset = (moment - self.epoch) / self.step
+        return math.ceil(offset) if round_up else math.floor(offset)
+
+    def moment(self, cell):
+        return self.epoch + cell * self.step
+
+    def block(self, busy, key, start, end):
+        """Mark an external booking (PT session, existing class) as busy."""
+        cells = busy.setdefault(key, {})
+        for c in range(self.cell(start), self.cell(end, round_up=True)):
+            cells[c] = None
+
+    def is_free(self, busy, key, start_cell):
+        cells = busy.get(key)
+        if not cells:
+            return True
+        return all(c not in cells for c in range(start_cell, start_cell + self.class_cells))
+
+    def owners(self, busy, key, start_cell):
+        cells = busy.get(key, {})
+        return {cells[c] for c in range(start_cell, start_cell + self.class_cells) if c in cells}
+
+    def occupy(self, idx, start_cell, room_id, trainer_id):
+        for c in range(start_cell, start_cell + self.class_cells):
+            self.room_busy.setdefault(room_id, {})[c] = idx
+            self.trainer_busy.setdefault(trainer_id, {})[c] = idx
+
+    def release(self, start_cell, room_id, trainer_id):
+        for c in range(start_cell, start_cell + self.class_cells):
+            self.room_busy[room_id].pop(c, None)
+            self.trainer_busy[trainer_id].pop(c, None)
+
+
+def plan_class_schedule(requests, rooms, trainers, availability, room_bookings=(), trainer_bookings=(), step_minutes=30):
+    """Assign a start time, room and trainer to each class request.
+
+    requests: dicts with ``class_name``, ``window_start``, ``window_end`` (datetimes
+        bounding the class), ``capacity`` and optional ``certification``.
+    rooms: ``(room_id, capacity)`` tuples.
+    trainers: ``(trainer_id, certification)`` tuples.
+    availability: ``(trainer_id, start, end)`` slots; a class must start inside one.
+    room_bookings / trainer_bookings: ``(room_id|trainer_id, start, end)`` intervals
+        already taken by PT sessions or scheduled classes.
+
+    Requests are placed greedily (most constrained first, smallest adequate room),
+    then unplaced requests are retried by relocating a blocking class, and finally
+    classes are moved to tighter rooms where one is free. Returns
+    ``(assignments, unassigned)`` where assignments map request index to
+    ``{"class_time", "room_id", "trainer_id", "waste"}``.
+    """
+    if not requests:
+        return {}, []
+    epoch = min(r["window_start"] for r in requests).replace(hour=0, minute=0, second=0, microsecond=0)
+    sched = _Schedule(epoch, step_minutes)
+
+    room_caps = dict(rooms)
+    rooms_by_cap = sorted(rooms, key=lambda r: (r[1], r[0]))
+    sorted_caps = [cap for _, cap in rooms_by_cap]
+
+    # Cells at which each trainer may start a class
+    allowed_starts = {}
+    for trainer_id, start, end in availability:
+        cells = allowed_starts.setdefault(trainer_id, set())
+        cells.update(range(sched.cell(start, round_up=True), sched.cell(end) + 1))
+    trainers_by_cert = {}
+    for trainer_id, cert in trainers:
+        trainers_by_cert.setdefault((cert or "").upper(), []).append(trainer_id)
+    all_trainers = [t for t, _ in trainers]
+    # Prefer trainers with the fewest open start cells so flexible trainers stay free
+    flexibility = {t: len(allowed_starts.get(t, ())) for t in all_trainers}
+
+    for room_id, start, end in room_bookings:
+        sched.block(sched.room_busy, room_id, start, end)
+    for trainer_id, start, end in trainer_bookings:
+        sched.block(sched.trainer_busy, trainer_id, start, end)
+
+    def candidate_cells(req):
+        first = sched.cell(req["window_start"], round_up=True)
+        last = sched.cell(req["window_end"] - CLASS_DURATION)
+        return range(first, last + 1)
+
+    def eligible_trainers(req):
+        cert = req.get("certification")
+        pool = trainers_by_cert.get(cert.upper(), []) if cert else all_trainers
+        return sorted(pool, key=lambda t: flexibility[t])
+
+    def adequate_rooms(req):
+        return rooms_by_cap[bisect.bisect_left(sorted_caps, req["capacity"]) :]
+
+    req_cells = [candidate_cells(r) for r in requests]
+    req_trainers = [eligible_trainers(r) for r in requests]
+    req_rooms = [adequate_rooms(r) for r in requests]
+
+    def free_trainer(idx, cell):
+        for trainer_id in req_trainers[idx]:
+            if cell in allowed_starts.get(trainer_id, ()) and sched.is_free(sched.trainer_busy, trainer_id, cell):
+                return trainer_id
+        return None
+
+    def best_placement(idx):
+        best = None
+        for cell in req_cells[idx]:
+            for room_id, cap in req_rooms[idx]:
+                if best and cap - requests[idx]["capacity"] >= best[0]:
+                    break
+                if not sched.is_free(sched.room_busy, room_id, cell):
+                    continue
+                trainer_id = free_trainer(idx, cell)
+                if trainer_id is None:
+                    break
+                best = (cap - requests[idx]["capacity"], cell, room_id, trainer_id)
+                break
+        return best
+
+    assignments = {}
+
+    def place(idx, cell, room_id, trainer_id):
+        sched.occupy(idx, cell, room_id, trainer_id)
+        assignments[idx] = (cell, room_id, trainer_id)
+
+    def unplace(idx):
+        cell, room_id, trainer_id = assignments.pop(idx)
+        sched.release(cell, room_id, trainer_id)
+
+    # Greedy construction, most constrained requests first
+    order = sorted(
+        range(len(requests)),
+        key=lambda i: (len(req_cells[i]) * len(req_rooms[i]) * max(len(req_trainers[i]), 1), -requests[i]["capacity"]),
+    )
+    unassigned = []
+    for idx in order:
+        choice = best_placement(idx)
+        if choice:
+            place(idx, *choice[1:])
+        else:
+            unassigned.append(idx)
+
+    # Repair: free a room slot by relocating the single class that blocks it
+    still_unassigned = []
+    for idx in unassigned:
+        placed = False
+        for cell in req_cells[idx]:
+            for room_id, _ in req_rooms[idx]:
+                blockers = sched.owners(sched.room_busy, room_id, cell)
+                if len(blockers) != 1 or None in blockers:
+                    continue
+                blocker = blockers.pop()
+                old = assignments[blocker]
+                unplace(blocker)
+                trainer_id = free_trainer(idx, cell)
+                if trainer_id is not None:
+                    place(idx, cell, room_id, trainer_id)
+                    moved = best_placement(blocker)
+                    if moved:
+                        place(blocker, *moved[1:])
+                        placed = True
+                        break
+                    unplace(idx)
+                place(blocker, *old)
+            if placed:
+                break
+        if not placed:
+            still_unassigned.append(idx)
+
+    # Improvement: move classes into tighter rooms that are free at the same time
+    for idx in list(assignments):
+        cell, room_id, trainer_id = assignments[idx]
+        for candidate, cap in req_rooms[idx]:
+            if cap >= room_caps[room_id]:
+                break
+            if sched.is_free(sched.room_busy, candidate, cell):
+                unplace(idx)
+                place(idx, cell, candidate, trainer_id)
+                break
+
+    result = {
+        idx: {
+            "class_time": sched.moment(cell),
+            "room_id": room_id,
+            "trainer_id": trainer_id,
+            "waste": room_caps[room_id] - requests[idx]["capacity"],
+        }
+        for idx, (cell, room_id, trainer_id) in assignments.items()
+    }
+    return result, sorted(still_unassigned)
+
+
+def benchmark(num_classes=500, num_rooms=25, num_trainers=60, seed=42):
+    """Plan a synthetic week of classes and print timing and fit statistics."""
+    rng = random.Random(seed)
+    week_start = datetime(2030, 1, 7)
+    certs = ["NASM", "ACE", "ISSA", "YOGA"]
+    rooms = [(i, rng.choice([8, 12, 15, 20, 25, 30, 40])) for i in range(1, num_rooms + 1)]
+    trainers = [(i, rng.choice(certs)) for i in range(1, num_trainers + 1)]
+    availability = []
+    for trainer_id, _ in trainers:
+        for day in rng.sample(range(7), 5):
+            start = week_start + timedelta(days=day, hours=rng.choice([6, 8, 10, 12]))
+            availability.append((trainer_id, start, start + timedelta(hours=8)))
+    room_bookings = []
+    for _ in range(num_rooms * 4):
+        start = week_start + timedelta(days=rng.randrange(7), hours=rng.randrange(6, 21))
+        room_bookings.append((rng.choice(rooms)[0], start, start + CLASS_DURATION))
+    requests = []
+    for i in range(num_classes):
+        start = week_start + timedelta(days=rng.randrange(7), hours=rng.randrange(6, 19))
+        requests.append(
+            {
+                "class_name": f"Class {i}",
+                "window_start": start,
+                "window_end": start + timedelta(hours=rng.choice([2, 3, 4])),
+                "capacity": rng.randint(5, 35),
+                "certification": rng.choice(certs + [None]),
+            }
+        )
+
+    began = time.perf_counter()
+    assignments, unassigned = plan_class_schedule(requests, rooms, trainers, availability, room_bookings)
+    elapsed = time.perf_counter() - began
+    total_waste = sum(a["waste"] for a in assignments.values())
+    print(f"classes={num_classes} rooms={num_rooms} trainers={num_trainers}")
+    print(f"assigned={len(assignments)} unassigned={len(unassigned)} total_waste={total_waste} seconds={elapsed:.3f}")
+
+
+if __name__ == "__main__":
+    benchmark()
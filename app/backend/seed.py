@@ -11,6 +11,9 @@ if PROJECT_ROOT not in sys.path:
     sys.path.append(PROJECT_ROOT)
 
 from db import engine, get_session
+from maintenance import rebuild_maintenance_stats
+from metrics_maintenance import ensure_partitions
+from revenue import backfill_revenue
 from models import (
     Base,
     ClassRegistration,
@@ -35,6 +38,8 @@ def seed(reset: bool = True):
         print("Resetting database (drop/create)...")
         Base.metadata.drop_all(bind=engine)
         Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            ensure_partitions(conn, start=date(2025, 10, 1))
 
     with get_session() as session:
         if session.query(Member).count() > 0:
@@ -115,6 +120,8 @@ def seed(reset: bool = True):
                 ClassRegistration(member_id=members[2].member_id, class_id=classes[1].class_id),
             ]
         )
+        classes[0].enrolled_count = 2
+        classes[1].enrolled_count = 1
 
         equipment = [
             Equipment(room_id=rooms[0].room_id, equipment_name="Treadmill", status="OPERATIONAL"),
@@ -133,9 +140,9 @@ def seed(reset: bool = True):
         )
 
         invoices = [
-            Invoice(member_id=members[0].member_id, issue_date=date(2025, 10, 15), total_amount=Decimal("120.00"), status="PAID", notes="Membership and PT"),
+            Invoice(member_id=members[0].member_id, issue_date=date(2025, 10, 15), total_amount=Decimal("120.00"), amount_paid=Decimal("120.00"), status="PAID", notes="Membership and PT"),
             Invoice(member_id=members[1].member_id, issue_date=date(2025, 10, 20), total_amount=Decimal("75.00"), status="UNPAID", notes="Yoga punch pass"),
-            Invoice(member_id=members[2].member_id, issue_date=date(2025, 10, 22), total_amount=Decimal("95.00"), status="PAID", notes="Monthly plan"),
+            Invoice(member_id=members[2].member_id, issue_date=date(2025, 10, 22), total_amount=Decimal("95.00"), amount_paid=Decimal("95.00"), status="PAID", notes="Monthly plan"),
         ]
         session.add_all(invoices)
         session.flush()
@@ -156,7 +163,10 @@ def seed(reset: bool = True):
                 Payment(invoice_id=invoices[2].invoice_id, amount=Decimal("0.00"), payment_method="CASH", status="SUCCESS", payment_date=datetime(2025, 10, 22)),
             ]
         )
-        print("Seeding complete.")
+    backfill_revenue()
+    with engine.begin() as conn:
+        rebuild_maintenance_stats(conn)
+    print("Seeding complete.")
 
 
 if __name__ == "__main__":
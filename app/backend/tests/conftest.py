@@ -0,0 +1,116 @@
+"""Shared fixtures for the Postgres-backed tests.
+
+Set TEST_DATABASE_URL to run them. The app's engine is pointed at that database
+and every connection works in a throwaway schema created for the test session,
+so the tests never touch existing tables.
+"""
+import base64
+import os
+import sys
+import uuid
+from contextlib import contextmanager
+
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PROJECT_ROOT = os.path.abspath(os.path.join(BACKEND_DIR, "..", ".."))
+for path in (BACKEND_DIR, PROJECT_ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+TEST_SCHEMA = f"app_test_{uuid.uuid4().hex[:8]}"
+if TEST_DATABASE_URL:
+    # Both are read when db.py is first imported, i.e. after this module runs
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ["PGOPTIONS"] = f"-csearch_path={TEST_SCHEMA},public"
+
+
+@pytest.fixture(scope="session")
+def database():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    from sqlalchemy import text
+
+    from db import engine
+    from metrics_maintenance import ensure_partitions
+    from models import Base, Member
+
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {TEST_SCHEMA}"))
+        trgm = conn.execute(text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first()
+    if not trgm:
+        # Servers without contrib cannot build the fuzzy search index; nothing here uses it
+        Member.__table__.dispatch.before_create.clear()
+        Member.__table__.indexes = {ix for ix in Member.__table__.indexes if ix.name != "ix_members_search_trgm"}
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        ensure_partitions(conn)
+    yield engine
+    engine.dispose()
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA {TEST_SCHEMA} CASCADE"))
+    engine.dispose()
+
+
+@pytest.fixture
+def db(database):
+    """Empty tables and per-process caches before each test."""
+    from sqlalchemy import text
+
+    import app as app_module
+    from models import Base
+
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    with database.begin() as conn:
+        conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+    app_module.ar_aging_cache.clear()
+    app_module.room_readiness_cache.clear()
+    return database
+
+
+@pytest.fixture
+def client(db):
+    from app import app
+
+    return app.test_client()
+
+
+def admin_auth():
+    from app import ADMIN_PASSWORD, ADMIN_USERNAME
+
+    token = base64.b64encode(f"{ADMIN_USERNAME}:{ADMIN_PASSWORD}".encode()).decode()
+    return {"Authorization": f"Basic {token}"}
+
+
+def make_member(session, name):
+    """Add and flush a member called ``name``; returns it."""
+    from models import Member
+
+    member = Member(
+        first_name=name.title(),
+        last_name="Test",
+        username=name,
+        email=f"{name}@mail.com",
+        password_hash="x",
+    )
+    session.add(member)
+    session.flush()
+    return member
+
+
+@contextmanager
+def count_queries(engine):
+    """Collect the statements ``engine`` sends to the database inside the block."""
+    from sqlalchemy import event
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
@@ -0,0 +1,49 @@
+from datetime import date
+
+from sqlalchemy import text
+
+from billing import run_billing
+from conftest import admin_auth, make_member
+from db import get_session
+
+
+def aging_total(client):
+    response = client.get("/admin/reports/ar-aging?as_of=2025-12-01&cached=true", headers=admin_auth())
+    assert response.status_code == 200
+    return response.get_json()["totals"]["total"]
+
+
+def test_cached_report_sees_writes_from_other_processes(client):
+    with get_session() as session:
+        member_id = make_member(session, "ada").member_id
+    assert aging_total(client) == 0
+
+    # The billing CLI runs in its own process and never touches this one's cache
+    run_billing("2025-11", [{"unit_price": "40"}], member_ids=[member_id])
+    assert aging_total(client) == 40.0
+
+    with get_session() as session:
+        invoice_id = session.execute(text("SELECT invoice_id FROM invoices")).scalar_one()
+    response = client.post(
+        f"/admin/invoices/{invoice_id}/payments", json={"amount": "15"}, headers=admin_auth()
+    )
+    assert response.status_code == 201
+    assert aging_total(client) == 25.0
+
+
+def test_cached_report_is_reused_until_a_write(client, db):
+    with get_session() as session:
+        make_member(session, "ada")
+    assert aging_total(client) == 0
+    # A change the version does not cover is not picked up, i.e. the snapshot was served
+    with db.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO invoices (member_id, issue_date, total_amount, amount_paid, status)"
+                " VALUES (1, :day, 10, 0, 'UNPAID')"
+            ),
+            {"day": date(2025, 11, 1)},
+        )
+    assert aging_total(client) == 0
+    fresh = client.get("/admin/reports/ar-aging?as_of=2025-12-01", headers=admin_auth()).get_json()
+    assert fresh["totals"]["total"] == 10.0
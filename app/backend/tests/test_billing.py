@@ -0,0 +1,36 @@
+from decimal import Decimal
+
+import pytest
+
+from billing import parse_plan
+
+
+@pytest.mark.parametrize(
+    "items",
+    [
+        [{"unit_price": "NaN"}],
+        [{"unit_price": "Infinity"}],
+        [{"unit_price": "-Infinity"}],
+        [{"unit_price": "1000000"}],
+        [{"unit_price": "500000", "quantity": 2}],
+        [{"unit_price": "999999.995"}],
+        [{"unit_price": "0", "quantity": 2**31}],
+        ["monthly"],
+        [None],
+        {"unit_price": "10"},
+    ],
+)
+def test_parse_plan_rejects_values_the_invoice_tables_cannot_hold(items):
+    with pytest.raises(ValueError):
+        parse_plan(items)
+
+
+def test_parse_plan_rounds_prices_to_cents():
+    plan, total = parse_plan([{"description": "Gym", "unit_price": "19.999", "quantity": 2}, {"unit_price": 0.004}])
+    assert [item["unit_price"] for item in plan] == [Decimal("20.00"), Decimal("0.00")]
+    assert total == Decimal("40.00")
+
+
+def test_parse_plan_accepts_the_largest_total():
+    _, total = parse_plan([{"unit_price": "999999.99"}])
+    assert total == Decimal("999999.99")
@@ -0,0 +1,25 @@
+import pytest
+
+from app import app, expand_weekly_occurrences
+from conftest import admin_auth
+
+
+def rule(start_date, end_date):
+    return {"weekdays": ["mon", "thu"], "start_date": start_date, "end_date": end_date, "time": "18:00"}
+
+
+def test_series_may_span_up_to_the_limit():
+    occurrences = expand_weekly_occurrences(rule("2030-01-01", "2030-12-31"))
+    assert len(occurrences) == 104
+
+
+@pytest.mark.parametrize("end_date", ["2031-01-02", "9999-12-31"])
+def test_series_beyond_the_limit_is_rejected(end_date):
+    with pytest.raises(ValueError, match="at most"):
+        expand_weekly_occurrences(rule("2030-01-01", end_date))
+    response = app.test_client().post(
+        "/admin/class-series",
+        json={"class_name": "Spin", "recurrence": rule("2030-01-01", end_date)},
+        headers=admin_auth(),
+    )
+    assert response.status_code == 400
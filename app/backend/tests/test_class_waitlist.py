@@ -0,0 +1,107 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app import app
+from conftest import admin_auth, make_member
+from db import get_session
+from models import ClassRegistration, ClassWaitlist, GroupClass
+
+
+def make_class(session, capacity, hours_ahead=48):
+    group_class = GroupClass(
+        class_name="Spin", class_time=datetime.utcnow() + timedelta(hours=hours_ahead), capacity=capacity
+    )
+    session.add(group_class)
+    session.flush()
+    return group_class
+
+
+def setup_class(capacity, members):
+    with get_session() as session:
+        class_id = make_class(session, capacity).class_id
+        member_ids = [make_member(session, f"member{i}").member_id for i in range(members)]
+    return class_id, member_ids
+
+
+def register(client, member_id, class_id):
+    return client.post(
+        "/classes/register", json={"member_id": member_id, "class_id": class_id}, headers=admin_auth()
+    )
+
+
+def class_counts(class_id):
+    with get_session() as session:
+        group_class = session.get(GroupClass, class_id)
+        registered = session.scalar(
+            select(func.count()).select_from(ClassRegistration).where(ClassRegistration.class_id == class_id)
+        )
+        waiting = session.scalars(
+            select(ClassWaitlist.member_id).where(ClassWaitlist.class_id == class_id).order_by(ClassWaitlist.waitlist_id)
+        ).all()
+        return group_class, registered, waiting
+
+
+def test_concurrent_registrations_never_overfill_the_class(client):
+    class_id, member_ids = setup_class(capacity=4, members=12)
+    start = threading.Barrier(len(member_ids))
+
+    def attempt(member_id):
+        start.wait()
+        return register(app.test_client(), member_id, class_id).status_code
+
+    with ThreadPoolExecutor(len(member_ids)) as pool:
+        statuses = list(pool.map(attempt, member_ids))
+
+    group_class, registered, waiting = class_counts(class_id)
+    assert statuses.count(201) == 4 and statuses.count(202) == 8
+    assert group_class.enrolled_count == registered == 4
+    assert group_class.waitlist_count == len(waiting) == 8
+
+
+def test_newcomers_queue_behind_the_waitlist(client):
+    class_id, (first, second, newcomer) = setup_class(capacity=1, members=3)
+    assert register(client, first, class_id).status_code == 201
+    assert register(client, second, class_id).status_code == 202
+
+    # A seat opens without a promotion, e.g. a counter repair; the queue still goes first
+    with get_session() as session:
+        session.get(GroupClass, class_id).capacity = 2
+    response = register(client, newcomer, class_id)
+    assert response.status_code == 202
+    assert response.get_json()["waitlist_position"] == 1
+
+    group_class, registered, waiting = class_counts(class_id)
+    assert waiting == [newcomer]
+    assert group_class.enrolled_count == registered == 2
+
+
+def test_raising_capacity_promotes_in_queue_order(client):
+    class_id, member_ids = setup_class(capacity=1, members=4)
+    for member_id in member_ids:
+        register(client, member_id, class_id)
+
+    response = client.put(f"/admin/classes/{class_id}", json={"capacity": 3}, headers=admin_auth())
+    assert response.status_code == 200
+    assert response.get_json()["promoted_member_ids"] == member_ids[1:3]
+
+    group_class, registered, waiting = class_counts(class_id)
+    assert group_class.enrolled_count == registered == 3
+    assert group_class.waitlist_count == 1 and waiting == member_ids[3:]
+
+
+def test_no_promotion_into_a_cancelled_class(client):
+    class_id, (first, second) = setup_class(capacity=1, members=2)
+    register(client, first, class_id)
+    register(client, second, class_id)
+    assert client.post(f"/admin/classes/{class_id}/cancel", headers=admin_auth()).status_code == 200
+
+    response = client.post(
+        "/classes/unregister", json={"member_id": first, "class_id": class_id}, headers=admin_auth()
+    )
+    assert response.get_json()["promoted_member_id"] is None
+    group_class, registered, waiting = class_counts(class_id)
+    assert group_class.enrolled_count == registered == 0
+    assert waiting == [second]
@@ -0,0 +1,69 @@
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, select
+
+from conftest import admin_auth, count_queries, make_member
+from db import get_session
+from models import Base, ClassRegistration, Equipment, GroupClass, MaintenanceLog, Room
+
+
+def make_room(name, classes, members_per_class):
+    """A room with ``classes`` classes, each full of members, and one logged machine per class."""
+    with get_session() as session:
+        room = Room(room_name=name, capacity=members_per_class)
+        session.add(room)
+        session.flush()
+        members = [make_member(session, f"{name}{i}") for i in range(members_per_class)]
+        for i in range(classes):
+            group_class = GroupClass(
+                class_name=f"Class {i}",
+                room_id=room.room_id,
+                class_time=datetime.utcnow() + timedelta(days=i + 1),
+                capacity=members_per_class,
+            )
+            equipment = Equipment(room_id=room.room_id, equipment_name=f"Machine {i}")
+            session.add_all([group_class, equipment])
+            session.flush()
+            session.add(MaintenanceLog(equipment_id=equipment.equipment_id, issue_description="Noisy", status="OPEN"))
+            session.add_all(
+                ClassRegistration(member_id=m.member_id, class_id=group_class.class_id) for m in members
+            )
+        return room.room_id
+
+
+def delete_room(client, db, room_id):
+    """Delete ``room_id``; return (statements run, ORM objects loaded, peak bytes allocated)."""
+    loaded = []
+
+    def on_load(target, context):
+        loaded.append(target)
+
+    event.listen(Base, "load", on_load, propagate=True)
+    tracemalloc.start()
+    try:
+        with count_queries(db) as statements:
+            response = client.delete(f"/admin/rooms/{room_id}", headers=admin_auth())
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        event.remove(Base, "load", on_load)
+    assert response.status_code == 200
+    return len(statements), len(loaded), peak
+
+
+def test_delete_room_cost_does_not_grow_with_its_contents(client, db):
+    small = make_room("small", classes=1, members_per_class=1)
+    large = make_room("large", classes=40, members_per_class=25)
+    delete_room(client, db, make_room("warmup", classes=1, members_per_class=1))
+
+    small_queries, small_loaded, small_peak = delete_room(client, db, small)
+    large_queries, large_loaded, large_peak = delete_room(client, db, large)
+
+    # The database cascade removes the children; only the room itself is loaded
+    assert small_queries == large_queries
+    assert small_loaded == large_loaded == 1
+    assert large_peak < small_peak * 1.5
+    with get_session() as session:
+        assert session.scalar(select(func.count()).select_from(ClassRegistration)) == 0
+        assert session.scalar(select(func.count()).select_from(MaintenanceLog)) == 0
@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import update
+
+from conftest import admin_auth
+from db import get_session
+from models import Equipment, Room
+
+
+def make_equipment():
+    with get_session() as session:
+        room = Room(room_name="Studio A", capacity=20)
+        session.add(room)
+        session.flush()
+        equipment = Equipment(room_id=room.room_id, equipment_name="Rower", is_critical=True)
+        session.add(equipment)
+        session.flush()
+        return equipment.equipment_id
+
+
+@pytest.mark.parametrize("equipment_status", [5, ["UNDER_REPAIR"], "smashed", ""])
+def test_maintenance_rejects_unknown_equipment_status(client, equipment_status):
+    equipment_id = make_equipment()
+    response = client.post(
+        f"/admin/equipment/{equipment_id}/maintenance",
+        json={"issue_description": "Belt slipping", "equipment_status": equipment_status},
+        headers=admin_auth(),
+    )
+    assert response.status_code == 400
+    with get_session() as session:
+        assert session.get(Equipment, equipment_id).status == "OPERATIONAL"
+
+
+def test_maintenance_sets_equipment_status(client):
+    equipment_id = make_equipment()
+    response = client.post(
+        f"/admin/equipment/{equipment_id}/maintenance",
+        json={"issue_description": "Belt slipping", "equipment_status": "under_repair"},
+        headers=admin_auth(),
+    )
+    assert response.status_code == 201
+    log_id = response.get_json()["log_id"]
+    response = client.put(f"/admin/maintenance/{log_id}", json={"equipment_status": None}, headers=admin_auth())
+    assert response.status_code == 200
+    with get_session() as session:
+        assert session.get(Equipment, equipment_id).status == "UNDER_REPAIR"
+
+
+def test_create_equipment_rejects_null_status(client):
+    response = client.post(
+        "/admin/equipment", json={"equipment_name": "Rower", "status": None}, headers=admin_auth()
+    )
+    assert response.status_code == 400
+
+
+def test_readiness_reports_null_status_as_unknown(client):
+    equipment_id = make_equipment()
+    with get_session() as session:
+        # Rows written before statuses were validated can hold NULL
+        session.execute(update(Equipment).where(Equipment.equipment_id == equipment_id).values(status=None))
+    response = client.get("/rooms/readiness", headers=admin_auth())
+    assert response.status_code == 200
+    (room,) = response.get_json()
+    assert room["status_counts"] == {"UNKNOWN": 1}
+    assert room["critical_out_of_service"] == 1 and not room["ready"]
@@ -0,0 +1,105 @@
+from datetime import date, datetime
+
+import app as app_module
+
+from conftest import admin_auth, make_member
+from db import get_session
+from models import HealthMetric, HealthMetricDaily
+
+
+def test_series_combines_rolled_up_history_with_raw_readings(client):
+    with get_session() as session:
+        member_id = make_member(session, "alice").member_id
+        session.add_all(
+            [
+                # Days whose raw partition was already dropped
+                HealthMetricDaily(
+                    member_id=member_id,
+                    day=date(2023, 1, 5),
+                    readings=3,
+                    weight_readings=2,
+                    weight_avg=80,
+                    weight_min=79,
+                    weight_max=81,
+                    heart_rate_readings=3,
+                    heart_rate_avg=60,
+                    heart_rate_min=55,
+                    heart_rate_max=65,
+                ),
+                HealthMetricDaily(
+                    member_id=member_id,
+                    day=date(2023, 1, 20),
+                    readings=1,
+                    weight_readings=1,
+                    weight_avg=90,
+                    weight_min=90,
+                    weight_max=90,
+                ),
+                HealthMetric(member_id=member_id, weight=70, recorded_at=datetime.now()),
+            ]
+        )
+
+    response = client.get(
+        f"/members/{member_id}/health-metrics/series?bucket=month&agg=avg,min,max", headers=admin_auth()
+    )
+
+    assert response.status_code == 200
+    old, recent = response.get_json()["points"]
+    assert old["bucket"] == "2023-01-01T00:00:00"
+    assert old["readings"] == 4
+    assert round(old["weight"]["avg"], 2) == 83.33
+    assert (old["weight"]["min"], old["weight"]["max"]) == (79, 90)
+    assert old["heart_rate"]["avg"] == 60
+    assert recent["readings"] == 1
+    assert recent["weight"]["avg"] == 70
+
+    response = client.get(
+        f"/members/{member_id}/health-metrics/series?bucket=month&start_date=2023-01-10", headers=admin_auth()
+    )
+    old = response.get_json()["points"][0]
+    assert old["readings"] == 1
+    assert old["weight"]["avg"] == 90
+
+
+def test_series_refuses_more_buckets_than_the_limit(client, monkeypatch):
+    monkeypatch.setattr(app_module, "METRIC_SERIES_MAX_POINTS", 2)
+    with get_session() as session:
+        member_id = make_member(session, "alice").member_id
+        session.add_all(
+            HealthMetricDaily(member_id=member_id, day=date(2023, 1, d), readings=1, weight_readings=1, weight_avg=80)
+            for d in (1, 2, 3)
+        )
+    url = f"/members/{member_id}/health-metrics/series"
+
+    response = client.get(f"{url}?bucket=day", headers=admin_auth())
+    assert response.status_code == 400
+    assert "more than 2 buckets" in response.get_json()["error"]
+    assert len(client.get(f"{url}?bucket=month", headers=admin_auth()).get_json()["points"]) == 1
+    narrowed = client.get(f"{url}?bucket=day&start_date=2023-01-02", headers=admin_auth())
+    assert len(narrowed.get_json()["points"]) == 2
+
+
+def test_bulk_rejects_fractional_heart_rates_and_keeps_the_first_duplicate(client):
+    with get_session() as session:
+        member_id = make_member(session, "alice").member_id
+    url = f"/members/{member_id}/health-metrics/bulk"
+    response = client.post(
+        url,
+        json=[
+            {"recorded_at": "2025-03-01T08:00:00", "heart_rate": 72.9},
+            {"recorded_at": "2025-03-01T09:00:00", "heart_rate": 70, "weight": 80},
+            {"recorded_at": "2025-03-01T09:00:00", "heart_rate": 99, "weight": 90},
+        ],
+        headers=admin_auth(),
+    )
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body["rejected"] == [{"index": 0, "error": "heart_rate must be a whole number"}]
+    assert (body["inserted"], body["duplicates"]) == (1, 1)
+
+    # A later request for a stored timestamp is dropped the same way
+    response = client.post(url, json=[{"recorded_at": "2025-03-01T09:00:00", "heart_rate": 88}], headers=admin_auth())
+    assert (response.get_json()["inserted"], response.get_json()["duplicates"]) == (0, 1)
+    with get_session() as session:
+        stored = session.query(HealthMetric).filter(HealthMetric.member_id == member_id).one()
+        assert (stored.heart_rate, stored.weight) == (70, 80)
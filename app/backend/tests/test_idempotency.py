@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, select
+
+import app as app_module
+from conftest import admin_auth
+from db import get_session
+from models import IdempotencyKey
+
+
+def test_purge_deletes_only_expired_keys(client, monkeypatch):
+    monkeypatch.setattr(app_module, "IDEMPOTENCY_PURGE_BATCH", 2)
+    now = datetime.utcnow()
+    with get_session() as session:
+        for i in range(5):
+            expired = now - timedelta(days=2)
+            session.add(IdempotencyKey(scope="POST /x", key=f"old-{i}", request_hash="h", created_at=expired))
+        session.add(IdempotencyKey(scope="POST /x", key="live", request_hash="h", created_at=now))
+
+    response = client.post("/admin/idempotency-keys/purge", headers=admin_auth())
+    assert response.status_code == 200
+    assert response.get_json() == {"purged": 5}
+    with get_session() as session:
+        assert session.scalars(select(IdempotencyKey.key)).all() == ["live"]
+
+
+def hold_key(conn, url, key):
+    """Insert the key row on ``conn`` without committing, like an unfinished first attempt."""
+    scope = f"POST {url} admin:{app_module.ADMIN_USERNAME}"
+    conn.execute(IdempotencyKey.__table__.insert().values(scope=scope, key=key, request_hash="h"))
+
+
+def test_lock_timeout_maps_to_conflict(client, db, monkeypatch):
+    monkeypatch.setattr(app_module, "IDEMPOTENCY_WAIT_SECONDS", 1)
+    url = "/admin/invoices/1/payments"
+    with db.connect() as conn:
+        hold_key(conn, url, "k1")
+        response = client.post(url, json={"amount": "5"}, headers={**admin_auth(), "Idempotency-Key": "k1"})
+        conn.rollback()
+    assert response.status_code == 409
+
+
+def test_other_operational_errors_are_not_conflicts(client, db):
+    url = "/admin/invoices/1/payments"
+
+    # Cancel the claim with a statement timeout (57014), also an OperationalError
+    def short_statement_timeout(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO idempotency_keys"):
+            cursor.execute("SET LOCAL statement_timeout = '200ms'")
+
+    event.listen(db, "before_cursor_execute", short_statement_timeout)
+    try:
+        with db.connect() as conn:
+            hold_key(conn, url, "k1")
+            response = client.post(url, json={"amount": "5"}, headers={**admin_auth(), "Idempotency-Key": "k1"})
+            conn.rollback()
+    finally:
+        event.remove(db, "before_cursor_execute", short_statement_timeout)
+    assert response.status_code == 500
@@ -0,0 +1,24 @@
+from app import member_typeahead, record_member_name_change
+from conftest import make_member
+from db import SessionLocal
+
+
+def test_typeahead_only_sees_committed_names(db):
+    member_typeahead.rebuild([], 0)
+
+    session = SessionLocal()
+    record_member_name_change(session, make_member(session, "ghost"))
+    assert member_typeahead.search("ghost") == []
+    session.rollback()
+    session.close()
+    assert member_typeahead.search("ghost") == []
+    assert member_typeahead.version == 0
+
+    session = SessionLocal()
+    member = make_member(session, "ada")
+    record_member_name_change(session, member)
+    assert member_typeahead.search("ada") == []
+    session.commit()
+    session.close()
+    assert [m["member_id"] for m in member_typeahead.search("ada")] == [member.member_id]
+    assert member_typeahead.version == 1
@@ -0,0 +1,139 @@
+"""Partitioning and retention of health_metrics against a real Postgres.
+
+Set TEST_DATABASE_URL to run; every test works in a throwaway schema.
+"""
+import os
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import metrics_maintenance
+from metrics_maintenance import DEFAULT_PARTITION, ensure_partitions, month_start, partition_name, rollup_expired
+from models import Base, HealthMetric, HealthMetricDaily
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    schema = f"metrics_test_{uuid.uuid4().hex[:8]}"
+    admin = create_engine(TEST_DATABASE_URL, future=True)
+    with admin.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+    engine = create_engine(
+        TEST_DATABASE_URL, future=True, connect_args={"options": f"-csearch_path={schema},public"}
+    )
+    with engine.begin() as conn:
+        # Only the key matters here; the full members table needs pg_trgm
+        conn.execute(text("CREATE TABLE members (member_id integer PRIMARY KEY)"))
+        conn.execute(text("INSERT INTO members VALUES (1)"))
+    Base.metadata.create_all(engine, tables=[HealthMetric.__table__, HealthMetricDaily.__table__])
+    monkeypatch.setattr(metrics_maintenance, "engine", engine)
+    yield engine
+    engine.dispose()
+    with admin.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+    admin.dispose()
+
+
+def add_readings(conn, *readings, heart_rate=None):
+    conn.execute(
+        text(
+            "INSERT INTO health_metrics (member_id, weight, heart_rate, recorded_at) "
+            "VALUES (1, :weight, :heart_rate, :recorded_at)"
+        ),
+        [{"weight": weight, "heart_rate": heart_rate, "recorded_at": recorded_at} for weight, recorded_at in readings],
+    )
+
+
+def partition_rows(conn, name):
+    return conn.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+
+
+def test_range_query_scans_only_matching_partition(engine):
+    this_month = month_start(date.today())
+    last_month = month_start(this_month, -1)
+    with engine.begin() as conn:
+        ensure_partitions(conn, start=last_month)
+        add_readings(conn, (80, datetime.combine(last_month, datetime.min.time())), (81, datetime.now()))
+        plan = "\n".join(
+            conn.execute(
+                text(
+                    "EXPLAIN SELECT * FROM health_metrics "
+                    "WHERE member_id = 1 AND recorded_at >= :lower AND recorded_at < :upper"
+                ),
+                {"lower": this_month, "upper": month_start(this_month, 1)},
+            ).scalars()
+        )
+    assert partition_name(this_month) in plan
+    assert partition_name(last_month) not in plan
+    assert DEFAULT_PARTITION not in plan
+
+
+def test_new_partition_takes_over_rows_from_default(engine):
+    far_month = month_start(date.today(), 6)
+    with engine.begin() as conn:
+        ensure_partitions(conn, months_ahead=1)
+        add_readings(conn, (80, datetime.combine(far_month, datetime.min.time())))
+        assert partition_rows(conn, DEFAULT_PARTITION) == 1
+
+    with engine.begin() as conn:
+        created = ensure_partitions(conn, months_ahead=6)
+        assert partition_name(far_month) in created
+        assert partition_rows(conn, partition_name(far_month)) == 1
+        assert partition_rows(conn, DEFAULT_PARTITION) == 0
+
+
+def test_rollup_drops_expired_partitions_and_merges_late_rows(engine):
+    old_month = month_start(date.today(), -30)
+    day = datetime.combine(old_month, datetime.min.time())
+    with engine.begin() as conn:
+        ensure_partitions(conn, start=old_month)
+        add_readings(conn, (80, day), (90, day + timedelta(hours=1)))
+
+    dropped = rollup_expired(retention_months=24)
+
+    assert partition_name(old_month) in dropped
+    assert partition_name(month_start(date.today())) not in dropped
+    with engine.begin() as conn:
+        assert conn.execute(text("SELECT to_regclass(:name)"), {"name": partition_name(old_month)}).scalar() is None
+        # The month's partition is gone, so a late reading lands in the default partition
+        add_readings(conn, (100, day + timedelta(hours=2)))
+
+    rollup_expired(retention_months=24)
+
+    with engine.connect() as conn:
+        daily = conn.execute(text("SELECT * FROM health_metric_daily WHERE member_id = 1")).one()
+        assert partition_rows(conn, DEFAULT_PARTITION) == 0
+    assert daily.day == old_month
+    assert daily.readings == 3
+    assert daily.weight_avg == Decimal("90.00")
+    assert daily.weight_min == Decimal("80.00")
+    assert daily.weight_max == Decimal("100.00")
+
+
+def test_late_rows_merge_each_metric_by_its_own_count(engine):
+    old_month = month_start(date.today(), -30)
+    day = datetime.combine(old_month, datetime.min.time())
+    with engine.begin() as conn:
+        ensure_partitions(conn, start=old_month)
+        add_readings(conn, (80, day))
+        # Heart-rate-only row, as wearables send
+        add_readings(conn, (None, day + timedelta(hours=1)), heart_rate=60)
+    rollup_expired(retention_months=24)
+    with engine.begin() as conn:
+        add_readings(conn, (100, day + timedelta(hours=2)), heart_rate=70)
+    rollup_expired(retention_months=24)
+
+    with engine.connect() as conn:
+        daily = conn.execute(text("SELECT * FROM health_metric_daily WHERE member_id = 1")).one()
+    assert daily.readings == 3
+    assert (daily.weight_readings, daily.heart_rate_readings, daily.body_fat_readings) == (2, 2, 0)
+    assert daily.weight_avg == Decimal("90.00")
+    assert daily.heart_rate_avg == Decimal("65.0")
+    assert daily.body_fat_avg is None
@@ -0,0 +1,56 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func, select
+
+from app import app, parse_payment_amount
+from conftest import admin_auth, make_member
+from db import get_session
+from models import Invoice, Payment
+from reconciliation import parse_settlement
+
+
+@pytest.mark.parametrize("value", ["0.001", "10.005", "NaN", "Infinity", "0", "-5", "abc", None])
+def test_payment_amount_rejects_invalid_values(value):
+    assert parse_payment_amount(value) is None
+
+
+@pytest.mark.parametrize("value, expected", [("10", "10"), ("10.5", "10.5"), ("10.250", "10.25"), (0.1, "0.1")])
+def test_payment_amount_accepts_whole_cents(value, expected):
+    assert parse_payment_amount(value) == Decimal(expected)
+
+
+def test_settlement_amount_rejects_fractions_of_a_cent():
+    with pytest.raises(ValueError, match="2 decimal places"):
+        parse_settlement(2, {"reference": "r1", "amount": "5.001", "date": "2025-11-01"})
+
+
+def test_parallel_payments_never_overpay(client):
+    with get_session() as session:
+        member = make_member(session, "ada")
+        invoice = Invoice(member_id=member.member_id, total_amount=Decimal("100"), status="UNPAID")
+        session.add(invoice)
+        session.flush()
+        invoice_id = invoice.invoice_id
+    attempts = 10
+    start = threading.Barrier(attempts)
+
+    def pay(i):
+        start.wait()
+        return app.test_client().post(
+            f"/admin/invoices/{invoice_id}/payments",
+            json={"amount": "30", "reference": f"ref-{i}"},
+            headers=admin_auth(),
+        ).status_code
+
+    with ThreadPoolExecutor(attempts) as pool:
+        statuses = list(pool.map(pay, range(attempts)))
+
+    assert statuses.count(201) == 3
+    with get_session() as session:
+        invoice = session.get(Invoice, invoice_id)
+        paid = session.scalar(select(func.sum(Payment.amount)).where(Payment.invoice_id == invoice_id))
+    assert invoice.amount_paid == paid == Decimal("90")
+    assert invoice.status == "PARTIAL"
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+from conftest import admin_auth, count_queries, make_member
+from db import get_session
+from models import ClassRegistration, FitnessGoal, GroupClass, HealthMetric, Trainer
+
+
+def make_roster(name, size):
+    """A trainer whose class has ``size`` members, each with a goal and a reading; returns the trainer id."""
+    with get_session() as session:
+        trainer = Trainer(
+            first_name=name.title(), last_name="Coach", username=name, email=f"{name}@mail.com", password_hash="x"
+        )
+        session.add(trainer)
+        session.flush()
+        group_class = GroupClass(
+            class_name="Spin",
+            trainer_id=trainer.trainer_id,
+            class_time=datetime.utcnow() - timedelta(days=1),
+            capacity=size,
+        )
+        session.add(group_class)
+        session.flush()
+        for i in range(size):
+            member = make_member(session, f"{name}{i}")
+            session.add_all(
+                [
+                    ClassRegistration(member_id=member.member_id, class_id=group_class.class_id),
+                    FitnessGoal(member_id=member.member_id, goal_type="weight", target_value=70),
+                    HealthMetric(member_id=member.member_id, weight=80, recorded_at=datetime.utcnow()),
+                ]
+            )
+        return trainer.trainer_id
+
+
+def test_query_count_does_not_grow_with_the_roster(client, db):
+    counts = {}
+    for name, size in (("solo", 1), ("crowd", 300)):
+        trainer_id = make_roster(name, size)
+        with count_queries(db) as statements:
+            response = client.get(f"/trainers/{trainer_id}/members/search?limit=200", headers=admin_auth())
+        assert response.status_code == 200
+        members = response.get_json()
+        assert len(members) == min(size, 200)
+        assert all(m["primary_goal"] == "weight" and m["last_metric"] and m["last_class"] for m in members)
+        counts[size] = len(statements)
+    # One statement for the whole page, however many members the trainer has
+    assert counts[1] == counts[300] == 1
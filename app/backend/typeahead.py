@@ -0,0 +1,94 @@
+"""In-process prefix index for front-desk member type-ahead.
+
+Entries live in a sorted list of ``(key, member_id)`` tuples, so a prefix lookup is
+a binary search plus a short forward scan. Keys are the lowercased first name,
+last name, "first last" and username of each member.
+"""
+import bisect
+import threading
+
+
+class MemberPrefixIndex:
+    def __init__(self, max_members):
+        self.max_members = max_members
+        self.version = None
+        self.enabled = True
+        self._entries = []
+        self._members = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _keys(first_name, last_name, username):
+        first, last = (first_name or "").lower(), (last_name or "").lower()
+        return {k for k in (first, last, f"{first} {last}", (username or "").lower()) if k}
+
+    def rebuild(self, rows, version):
+        """Replace the index with ``rows`` of (member_id, first_name, last_name, username)."""
+        rows = list(rows)
+        if len(rows) > self.max_members:
+            # Too large to hold in memory; callers fall back to the database
+            with self._lock:
+                self.enabled = False
+                self._entries, self._members, self.version = [], {}, version
+            return
+        members = {}
+        entries = []
+        for member_id, first_name, last_name, username in rows:
+            members[member_id] = {
+                "member_id": member_id,
+                "first_name": first_name,
+                "last_name": last_name,
+                "username": username,
+            }
+            entries.extend((key, member_id) for key in self._keys(first_name, last_name, username))
+        entries.sort()
+        with self._lock:
+            self.enabled = True
+            self._entries, self._members, self.version = entries, members, version
+
+    def upsert(self, member_id, first_name, last_name, username, version):
+        """Apply one member write; ``version`` is the change version the write produced.
+
+        The local version only advances when no other writer's change is missing,
+        otherwise the next staleness check triggers a rebuild.
+        """
+        with self._lock:
+            if not self.enabled:
+                return
+            old = self._members.get(member_id)
+            if old:
+                for key in self._keys(old["first_name"], old["last_name"], old["username"]):
+                    idx = bisect.bisect_left(self._entries, (key, member_id))
+                    if idx < len(self._entries) and self._entries[idx] == (key, member_id):
+                        del self._entries[idx]
+            elif len(self._members) >= self.max_members:
+                self.enabled = False
+                self._entries, self._members = [], {}
+                return
+            self._members[member_id] = {
+                "member_id": member_id,
+                "first_name": first_name,
+                "last_name": last_name,
+                "username": username,
+            }
+            for key in self._keys(first_name, last_name, username):
+                bisect.insort(self._entries, (key, member_id))
+            if self.version is not None and version == self.version + 1:
+                self.version = version
+
+    def search(self, prefix, limit=10):
+        """Return up to ``limit`` members with a key starting with ``prefix``."""
+        prefix = prefix.strip().lower()
+        results = []
+        seen = set()
+        with self._lock:
+            idx = bisect.bisect_left(self._entries, (prefix,))
+            while idx < len(self._entries) and len(results) < limit:
+                key, member_id = self._entries[idx]
+                if not key.startswith(prefix):
+                    break
+                if member_id not in seen:
+                    seen.add(member_id)
+                    results.append(self._members[member_id])
+                idx += 1
+        return results
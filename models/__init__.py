@@ -1,33 +1,47 @@
 from .base import Base
+from .change_version import ChangeVersion
 from .member import Member
+from .member_summary import MemberSummary
 from .trainer import Trainer
 from .room import Room
 from .fitness_goal import FitnessGoal
+from .idempotency_key import IdempotencyKey
 from .health_metric import HealthMetric
+from .health_metric_daily import HealthMetricDaily
 from .trainer_availability import TrainerAvailability
 from .personal_training_session import PersonalTrainingSession
 from .group_class import GroupClass
 from .class_registration import ClassRegistration
+from .class_waitlist import ClassWaitlist
 from .equipment import Equipment
 from .maintenance_log import MaintenanceLog
+from .maintenance_stats import MaintenanceStats
 from .invoice import Invoice
 from .invoice_item import InvoiceItem
 from .payment import Payment
+from .revenue_daily import RevenueDaily
 
 __all__ = [
     "Base",
+    "ChangeVersion",
     "Member",
+    "MemberSummary",
     "Trainer",
     "Room",
     "FitnessGoal",
+    "IdempotencyKey",
     "HealthMetric",
+    "HealthMetricDaily",
     "TrainerAvailability",
     "PersonalTrainingSession",
     "GroupClass",
     "ClassRegistration",
+    "ClassWaitlist",
     "Equipment",
     "MaintenanceLog",
+    "MaintenanceStats",
     "Invoice",
     "InvoiceItem",
     "Payment",
+    "RevenueDaily",
 ]
@@ -0,0 +1,12 @@
+from sqlalchemy import BigInteger, Column, String
+
+from .base import Base
+
+
+class ChangeVersion(Base):
+    """Monotonic per-entity write counter used to detect stale in-process caches."""
+
+    __tablename__ = "change_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, UniqueConstraint, func
+
+from .base import Base
+
+
+class ClassWaitlist(Base):
+    __tablename__ = "class_waitlist"
+    __table_args__ = (UniqueConstraint("member_id", "class_id", name="uq_waitlist_member_class"),)
+
+    # Serial id doubles as the FIFO position within a class
+    waitlist_id = Column(Integer, primary_key=True)
+    member_id = Column(Integer, ForeignKey("members.member_id", ondelete="CASCADE"), nullable=False)
+    class_id = Column(Integer, ForeignKey("group_classes.class_id", ondelete="CASCADE"), nullable=False, index=True)
+    created_at = Column(DateTime, server_default=func.now())
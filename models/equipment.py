@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Boolean, Column, Integer, String, ForeignKey
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -8,9 +8,13 @@ class Equipment(Base):
     __tablename__ = "equipment"
 
     equipment_id = Column(Integer, primary_key=True)
-    room_id = Column(Integer, ForeignKey("rooms.room_id"))
+    room_id = Column(Integer, ForeignKey("rooms.room_id", ondelete="CASCADE"))
     equipment_name = Column(String(100), nullable=False)
     status = Column(String(30), default="OPERATIONAL")
+    # PT sessions can be held back from rooms where critical equipment is down
+    is_critical = Column(Boolean, nullable=False, default=False, server_default="false")
 
     room = relationship("Room", overlaps="equipment")
-    maintenance_logs = relationship("MaintenanceLog", cascade="all, delete-orphan", overlaps="maintenance_logs")
+    maintenance_logs = relationship(
+        "MaintenanceLog", cascade="all, delete-orphan", passive_deletes=True, overlaps="maintenance_logs"
+    )
@@ -9,10 +9,12 @@ class GroupClass(Base):
 
     class_id = Column(Integer, primary_key=True)
     class_name = Column(String(100), nullable=False)
-    trainer_id = Column(Integer, ForeignKey("trainers.trainer_id"))
-    room_id = Column(Integer, ForeignKey("rooms.room_id"))
+    trainer_id = Column(Integer, ForeignKey("trainers.trainer_id", ondelete="CASCADE"))
+    room_id = Column(Integer, ForeignKey("rooms.room_id", ondelete="CASCADE"))
     class_time = Column(DateTime, nullable=False)
     capacity = Column(Integer, nullable=False)
+    enrolled_count = Column(Integer, nullable=False, default=0, server_default="0")
+    waitlist_count = Column(Integer, nullable=False, default=0, server_default="0")
     status = Column(String(20), default="SCHEDULED")
 
     trainer = relationship("Trainer", overlaps="classes")
@@ -1,14 +1,21 @@
-from sqlalchemy import Column, Integer, Numeric, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, Numeric, DateTime, ForeignKey, UniqueConstraint, func
 
 from .base import Base
 
 
 class HealthMetric(Base):
     __tablename__ = "health_metrics"
+    # Range-partitioned by month on recorded_at (see metrics_maintenance.py); Postgres
+    # requires the partition key in every unique constraint, hence the composite key.
+    __table_args__ = (
+        # Also serves latest-metric lookups and bulk-ingest deduplication
+        UniqueConstraint("member_id", "recorded_at", name="uq_health_metrics_member_recorded"),
+        {"postgresql_partition_by": "RANGE (recorded_at)"},
+    )
 
-    metric_id = Column(Integer, primary_key=True)
+    metric_id = Column(Integer, primary_key=True, autoincrement=True)
     member_id = Column(Integer, ForeignKey("members.member_id", ondelete="CASCADE"))
     weight = Column(Numeric(5, 2))
     heart_rate = Column(Integer)
     body_fat = Column(Numeric(5, 2))
-    recorded_at = Column(DateTime, server_default=func.now())
+    recorded_at = Column(DateTime, primary_key=True, server_default=func.now())
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Date, ForeignKey, Integer, Numeric
+
+from .base import Base
+
+
+class HealthMetricDaily(Base):
+    """Daily rollup of health_metrics, kept after raw partitions are dropped.
+
+    Each metric keeps its own reading count, since wearables often send rows
+    with only some fields set; averages are merged weighted by those counts.
+    """
+
+    __tablename__ = "health_metric_daily"
+
+    member_id = Column(Integer, ForeignKey("members.member_id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    readings = Column(Integer, nullable=False)
+    weight_readings = Column(Integer, nullable=False, server_default="0")
+    heart_rate_readings = Column(Integer, nullable=False, server_default="0")
+    body_fat_readings = Column(Integer, nullable=False, server_default="0")
+    weight_avg = Column(Numeric(5, 2))
+    weight_min = Column(Numeric(5, 2))
+    weight_max = Column(Numeric(5, 2))
+    heart_rate_avg = Column(Numeric(5, 1))
+    heart_rate_min = Column(Integer)
+    heart_rate_max = Column(Integer)
+    body_fat_avg = Column(Numeric(5, 2))
+    body_fat_min = Column(Numeric(5, 2))
+    body_fat_max = Column(Numeric(5, 2))
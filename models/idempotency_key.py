@@ -0,0 +1,18 @@
+from sqlalchemy import Column, DateTime, Integer, String, Text, func
+
+from .base import Base
+
+
+class IdempotencyKey(Base):
+    """Stored outcome of a POST made with an Idempotency-Key header."""
+
+    __tablename__ = "idempotency_keys"
+
+    # "<METHOD> <path> <caller>" so keys from different users or endpoints never collide
+    scope = Column(String(255), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer)
+    response_body = Column(Text)
+    mimetype = Column(String(100))
+    created_at = Column(DateTime, nullable=False, server_default=func.now(), index=True)
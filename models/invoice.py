@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Date, Integer, Numeric, String, Text, ForeignKey
+from sqlalchemy import Column, Date, Integer, Numeric, String, Text, ForeignKey, Index, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -7,15 +7,25 @@ from .base import Base
 
 class Invoice(Base):
     __tablename__ = "invoices"
+    # One invoice per member per billing run period; NULL periods (ad hoc invoices) never collide
+    __table_args__ = (
+        UniqueConstraint("member_id", "billing_period", name="uq_invoices_member_period"),
+        # Receivables reports only scan invoices with a balance left
+        Index("ix_invoices_outstanding", "member_id", postgresql_where=text("amount_paid < total_amount")),
+    )
 
     invoice_id = Column(Integer, primary_key=True)
-    member_id = Column(Integer, ForeignKey("members.member_id"))
+    member_id = Column(Integer, ForeignKey("members.member_id", ondelete="CASCADE"))
     issue_date = Column(Date, default=datetime.utcnow)
     due_date = Column(Date)
     total_amount = Column(Numeric(8, 2), nullable=False, default=0)
+    # Running sum of posted payments, maintained by post_invoice_payment
+    amount_paid = Column(Numeric(8, 2), nullable=False, default=0, server_default="0")
     status = Column(String(30), default="UNPAID")
     notes = Column(Text)
+    # "YYYY-MM" for invoices generated by billing.run_billing
+    billing_period = Column(String(7))
 
     member = relationship("Member", overlaps="invoices")
-    items = relationship("InvoiceItem", cascade="all, delete-orphan", overlaps="payments")
-    payments = relationship("Payment", cascade="all, delete-orphan", overlaps="items")
+    items = relationship("InvoiceItem", cascade="all, delete-orphan", passive_deletes=True, overlaps="payments")
+    payments = relationship("Payment", cascade="all, delete-orphan", passive_deletes=True, overlaps="items")
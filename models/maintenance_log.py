@@ -1,18 +1,35 @@
-from sqlalchemy import Column, DateTime, Integer, Text, String, ForeignKey, func
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Computed, DateTime, Index, Integer, Text, String, ForeignKey, func, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 
 from .base import Base
 
 
 class MaintenanceLog(Base):
     __tablename__ = "maintenance_logs"
+    __table_args__ = (
+        # The work queue only reads unresolved logs, a small slice of the history
+        Index("ix_maintenance_logs_open", "equipment_id", "created_at", postgresql_where=text("status <> 'RESOLVED'")),
+        Index("ix_maintenance_logs_search", "search_vector", postgresql_using="gin"),
+    )
 
     log_id = Column(Integer, primary_key=True)
-    equipment_id = Column(Integer, ForeignKey("equipment.equipment_id"))
+    equipment_id = Column(Integer, ForeignKey("equipment.equipment_id", ondelete="CASCADE"))
     issue_description = Column(Text)
     status = Column(String(30), default="OPEN")
     created_at = Column(DateTime, server_default=func.now())
     resolved_timestamp = Column(DateTime)
     resolution_notes = Column(Text)
+    # Generated by Postgres on every insert/update; issue text outranks resolution notes
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                "setweight(to_tsvector('english', coalesce(issue_description, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(resolution_notes, '')), 'B')",
+                persisted=True,
+            ),
+        )
+    )
 
     equipment = relationship("Equipment", overlaps="maintenance_logs")
@@ -0,0 +1,20 @@
+from sqlalchemy import BigInteger, Column, Integer, String
+
+from .base import Base
+
+
+class MaintenanceStats(Base):
+    """Running maintenance counters per equipment item or room.
+
+    Maintained incrementally by create_maintenance/update_maintenance;
+    mean time to repair is repair_seconds / resolved_count.
+    """
+
+    __tablename__ = "maintenance_stats"
+
+    scope = Column(String(20), primary_key=True)  # "equipment" or "room"
+    scope_id = Column(Integer, primary_key=True)
+    open_count = Column(Integer, nullable=False, default=0)
+    # Resolved logs with a resolution timestamp, and their summed time to repair
+    resolved_count = Column(Integer, nullable=False, default=0)
+    repair_seconds = Column(BigInteger, nullable=False, default=0)
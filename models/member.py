@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date
+from sqlalchemy import DDL, Column, Integer, String, Date, Index, event, func, literal_column
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -17,8 +17,23 @@ class Member(Base):
     gender = Column(String(20))
     phone = Column(String(30))
 
-    goals = relationship("FitnessGoal", cascade="all, delete-orphan")
-    metrics = relationship("HealthMetric", cascade="all, delete-orphan")
-    pt_sessions = relationship("PersonalTrainingSession", cascade="all, delete-orphan")
-    class_registrations = relationship("ClassRegistration", cascade="all, delete-orphan")
-    invoices = relationship("Invoice", cascade="all, delete-orphan")
+    goals = relationship("FitnessGoal", cascade="all, delete-orphan", passive_deletes=True)
+    metrics = relationship("HealthMetric", cascade="all, delete-orphan", passive_deletes=True)
+    pt_sessions = relationship("PersonalTrainingSession", cascade="all, delete-orphan", passive_deletes=True)
+    class_registrations = relationship("ClassRegistration", cascade="all, delete-orphan", passive_deletes=True)
+    invoices = relationship("Invoice", cascade="all, delete-orphan", passive_deletes=True)
+
+
+# Lowercased "first last username email" haystack for fuzzy search. Queries must use
+# this exact expression (separators rendered inline) for the trigram index to apply.
+_space = literal_column("' '")
+member_search_text = func.lower(
+    Member.first_name + _space + Member.last_name + _space + Member.username + _space + Member.email
+)
+Index(
+    "ix_members_search_trgm",
+    member_search_text.label("search_text"),
+    postgresql_using="gin",
+    postgresql_ops={"search_text": "gin_trgm_ops"},
+)
+event.listen(Member.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
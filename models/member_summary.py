@@ -0,0 +1,24 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, Numeric, func
+
+from .base import Base
+
+
+class MemberSummary(Base):
+    """Precomputed dashboard numbers, one row per member."""
+
+    __tablename__ = "member_summary"
+
+    member_id = Column(Integer, ForeignKey("members.member_id", ondelete="CASCADE"), primary_key=True)
+    total_goals = Column(Integer, nullable=False, default=0)
+    active_goals = Column(Integer, nullable=False, default=0)
+    upcoming_class_count = Column(Integer, nullable=False, default=0)
+    past_class_count = Column(Integer, nullable=False, default=0)
+    upcoming_pt_session_count = Column(Integer, nullable=False, default=0)
+    past_pt_session_count = Column(Integer, nullable=False, default=0)
+    latest_weight = Column(Numeric(5, 2))
+    latest_heart_rate = Column(Integer)
+    latest_body_fat = Column(Numeric(5, 2))
+    latest_recorded_at = Column(DateTime)
+    # Next time an upcoming class/session turns into a past one; the row is stale after this
+    refresh_after = Column(DateTime)
+    updated_at = Column(DateTime, server_default=func.now())
@@ -8,11 +8,12 @@ class Payment(Base):
     __tablename__ = "payments"
 
     payment_id = Column(Integer, primary_key=True)
-    invoice_id = Column(Integer, ForeignKey("invoices.invoice_id"))
+    invoice_id = Column(Integer, ForeignKey("invoices.invoice_id", ondelete="CASCADE"))
     amount = Column(Numeric(8, 2), nullable=False)
     payment_method = Column(String(30))
     status = Column(String(30), default="SUCCESS")
     payment_date = Column(DateTime, server_default=func.now())
-    reference = Column(String(120))
+    # Settlement reference; unique so a reference can only ever be posted once
+    reference = Column(String(120), unique=True)
 
     invoice = relationship("Invoice", overlaps="payments,items")
@@ -11,7 +11,7 @@ class PersonalTrainingSession(Base):
     session_id = Column(Integer, primary_key=True)
     member_id = Column(Integer, ForeignKey("members.member_id", ondelete="CASCADE"))
     trainer_id = Column(Integer, ForeignKey("trainers.trainer_id", ondelete="CASCADE"))
-    room_id = Column(Integer, ForeignKey("rooms.room_id"))
+    room_id = Column(Integer, ForeignKey("rooms.room_id", ondelete="CASCADE"))
     start_time = Column(DateTime, nullable=False)
     end_time = Column(DateTime, nullable=False)
     session_type = Column(String(50))
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Date, Integer, Numeric, String
+
+from .base import Base
+
+
+class RevenueDaily(Base):
+    """Successful payment revenue per day for one grouping dimension and key.
+
+    ``dimension`` is ``payment_method``, ``item`` (line item description, with the
+    payment split across items pro rata) or ``cohort`` (month of the member's first
+    invoice). Maintained by revenue.record_payment_revenue as payments post.
+    """
+
+    __tablename__ = "revenue_daily"
+
+    dimension = Column(String(20), primary_key=True)
+    day = Column(Date, primary_key=True)
+    key = Column(String(120), primary_key=True)
+    amount = Column(Numeric(12, 2), nullable=False, default=0)
+    payments = Column(Integer, nullable=False, default=0)
@@ -11,6 +11,6 @@ class Room(Base):
     room_name = Column(String(50), unique=True, nullable=False)
     capacity = Column(Integer, nullable=False)
 
-    classes = relationship("GroupClass", cascade="all, delete-orphan")
-    pt_sessions = relationship("PersonalTrainingSession", cascade="all, delete-orphan")
-    equipment = relationship("Equipment", cascade="all, delete-orphan")
+    classes = relationship("GroupClass", cascade="all, delete-orphan", passive_deletes=True)
+    pt_sessions = relationship("PersonalTrainingSession", cascade="all, delete-orphan", passive_deletes=True)
+    equipment = relationship("Equipment", cascade="all, delete-orphan", passive_deletes=True)
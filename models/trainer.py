@@ -15,6 +15,6 @@ class Trainer(Base):
     password_hash = Column(String(255), nullable=False)
     certification = Column(String(100))
 
-    availability = relationship("TrainerAvailability", cascade="all, delete-orphan")
-    pt_sessions = relationship("PersonalTrainingSession", cascade="all, delete-orphan")
-    classes = relationship("GroupClass", cascade="all, delete-orphan")
+    availability = relationship("TrainerAvailability", cascade="all, delete-orphan", passive_deletes=True)
+    pt_sessions = relationship("PersonalTrainingSession", cascade="all, delete-orphan", passive_deletes=True)
+    classes = relationship("GroupClass", cascade="all, delete-orphan", passive_deletes=True)